@@ -15,6 +15,78 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
     
+    # Principal cache (authenticated members, per worker)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Password hashing (bcrypt worker threads, per worker process)
+    PASSWORD_POOL_SIZE: int = 4
+    PASSWORD_QUEUE_LIMIT: int = 64
+    
+    # ID sequences (values leased per process from the counters collection)
+    SEQUENCE_BLOCK_SIZE: int = 100
+    
+    # Transaction history window when no "from" is given
+    TRANSACTIONS_DEFAULT_WINDOW_DAYS: int = 30
+    
+    # Transaction audit log: "strict" writes before responding,
+    # "fast" queues and flushes in batches (write-behind)
+    TXLOG_MODE: str = "strict"
+    TXLOG_BATCH_SIZE: int = 500
+    TXLOG_FLUSH_INTERVAL_MS: int = 200
+    TXLOG_ORDERED: bool = False
+    TXLOG_MAX_QUEUE: int = 50000
+    
+    # Catalog cache (per worker, encoded BSON under a memory budget)
+    CATALOG_CACHE_MAX_BOOKS: int = 1000000
+    CATALOG_CACHE_MAX_MB: int = 512
+    CATALOG_CACHE_TTL_SECONDS: int = 600
+    COPIES_CACHE_TTL_SECONDS: int = 30
+    
+    # Book search backend: "mongo" ($text index) or "bm25" (in-memory,
+    # per worker; loads the snapshot from jobs.py build-search-index plus
+    # books changed since)
+    SEARCH_BACKEND: str = "mongo"
+    SEARCH_SNAPSHOT_PATH: str = "search-index.pickle"
+    # Trigram index for fuzzy=true and for searches with no exact match
+    # (per worker, built in the background after startup; opt-in)
+    FUZZY_SEARCH_ENABLED: bool = False
+    
+    # Autocomplete for /books/suggest (per worker, popularity from books.borrowCount)
+    SUGGEST_ENABLED: bool = True
+    SUGGEST_CACHE_TTL_SECONDS: int = 60
+    
+    # Catalog-wide facet counts (unfiltered browse and categories)
+    FACET_CACHE_TTL_SECONDS: int = 300
+    
+    # Bulk catalog import: rows validated and written per round trip
+    IMPORT_CHUNK_SIZE: int = 1000
+    
+    # Admin exports: documents per cursor batch and per flushed chunk
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Dashboard counts (per worker snapshot, served stale while it refreshes)
+    DASHBOARD_REFRESH_SECONDS: int = 60
+    DASHBOARD_MIN_REFRESH_SECONDS: int = 5
+    
+    # Day boundaries for the daily_stats rollup (servers write naive
+    # wall-clock times in this zone)
+    STATS_TIMEZONE: str = "Asia/Ho_Chi_Minh"
+    
+    # Ranked top-borrowed lists for windows and branch filters (per worker)
+    LEADERBOARD_CACHE_TTL_SECONDS: int = 300
+    
+    # Domain events relayed between workers through a capped collection
+    EVENTS_ENABLED: bool = True
+    EVENTS_COLLECTION_MB: int = 16
+    EVENTS_FLUSH_INTERVAL_MS: int = 50
+    EVENTS_MAX_OUTBOX: int = 10000
+    
+    # Overdue sweeper (runs in one worker at a time)
+    OVERDUE_SWEEP_ENABLED: bool = True
+    OVERDUE_SWEEP_INTERVAL_SECONDS: int = 300
+    OVERDUE_SWEEP_BATCH_SIZE: int = 500
+    
     # CORS
     CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost:3001"]
     
@@ -0,0 +1,46 @@
+"""
+Bulk catalog import from a JSONL or CSV file
+Usage: python import_books.py <file.jsonl|file.csv> [--update-existing]
+
+Running API workers pick the new books up in their in-memory search,
+fuzzy and suggestion indexes from the book.updated events it publishes.
+"""
+
+import asyncio
+import json
+import sys
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.catalog_import import CatalogImport, FORMATS, read_rows
+from services.events import event_bus
+
+async def run_import(path: str, update_existing: bool):
+    fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        # Publish only: this process keeps no caches of its own
+        await event_bus.start(db, tail=False)
+        job = CatalogImport(db, update_existing=update_existing, chunk_size=settings.IMPORT_CHUNK_SIZE)
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            async for event in job.run(read_rows(stream, fmt)):
+                if event["type"] == "summary":
+                    print(f"✓ Imported {event['inserted']} books ({event['copies']} copies), "
+                          f"updated {event['updated']}, skipped {event['duplicates']} duplicates, "
+                          f"{event['errors']} errors in {event['seconds']}s")
+                    continue
+                for row in event["errorRows"]:
+                    print(f"✗ line {row['line']}: {json.dumps(row['errors'], ensure_ascii=False)}", file=sys.stderr)
+                print(f"  {event['rows']} rows, {event['rowsPerSec']} rows/s")
+    finally:
+        await event_bus.stop()
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 1:
+        print("Usage: python import_books.py <file.jsonl|file.csv> [--update-existing]")
+        print("Formats: " + ", ".join(FORMATS))
+        sys.exit(1)
+    asyncio.run(run_import(args[0], "--update-existing" in sys.argv))
@@ -0,0 +1,38 @@
+"""
+Maintenance jobs for counters and derived data
+Usage: python jobs.py <job-name>
+"""
+
+import asyncio
+import sys
+import time
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services import availability, circulation, daily_stats, leaderboard, search
+
+JOBS = {
+    "reconcile-active-loans": circulation.reconcile_active_loans,
+    "finish-returns": circulation.finish_returns,
+    "build-search-index": search.build_snapshot,
+    "backfill-search-fields": search.backfill_search_fields,
+    "rebuild-availability": availability.rebuild_availability,
+    "backfill-daily-stats": daily_stats.backfill_daily_stats,
+    "rebuild-borrow-stats": leaderboard.rebuild_borrow_stats,
+}
+
+async def run_job(name: str):
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        start_time = time.time()
+        result = await JOBS[name](db)
+        print(f"✓ {name} finished in {time.time() - start_time:.2f}s: {result}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in JOBS:
+        print("Usage: python jobs.py <job-name>")
+        print("Jobs: " + ", ".join(JOBS))
+        sys.exit(1)
+    asyncio.run(run_job(sys.argv[1]))
@@ -3,21 +3,47 @@ E-Library FastAPI Backend
 Main application entry point
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from config import settings
-from database import connect_to_mongo, close_mongo_connection
-from routers import auth, books, loans, stats, users, transactions
+from database import connect_to_mongo, close_mongo_connection, get_database
+from utils.security import PasswordPoolBusy, shutdown_password_executor
+from services.overdue import overdue_sweeper
+from services.txlog import transaction_log
+from services.search import search_backend
+from services.fuzzy import fuzzy_search
+from services.suggest import suggester
+from services.dashboard import dashboard_stats
+from services.events import event_bus
+from services.subscribers import register_subscribers
+from routers import auth, books, loans, stats, users, transactions, exports
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     await connect_to_mongo()
+    await search_backend.start(await get_database())
+    await fuzzy_search.start(await get_database())
+    await suggester.start(await get_database())
+    register_subscribers(event_bus)
+    await event_bus.start(await get_database())
+    transaction_log.start()
+    dashboard_stats.start()
+    if settings.OVERDUE_SWEEP_ENABLED:
+        overdue_sweeper.start()
     yield
     # Shutdown
+    await overdue_sweeper.stop()
+    await dashboard_stats.stop()
+    await transaction_log.stop()
+    await event_bus.stop()
+    await search_backend.stop()
+    await fuzzy_search.stop()
+    shutdown_password_executor()
     await close_mongo_connection()
 
 # Create FastAPI app
@@ -34,8 +60,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Targeting-Hint", "X-Search-Mode", "Content-Disposition"],
 )
 
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    """Shed login/register load instead of queueing unboundedly"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many authentication requests, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(books.router)
@@ -43,6 +79,7 @@ app.include_router(loans.router)
 app.include_router(users.router)
 app.include_router(stats.router)
 app.include_router(transactions.router)
+app.include_router(exports.router)
 
 @app.get("/")
 async def root():
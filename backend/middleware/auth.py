@@ -2,14 +2,29 @@
 Authentication middleware for FastAPI
 """
 
+import copy
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from utils.security import decode_access_token
+from utils.cache import TTLCache
 from database import get_database
+from config import settings
 
 security = HTTPBearer()
 
+# Members resolved from token subjects, so authenticated requests
+# skip the members lookup until the entry expires or is invalidated
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    name="principals"
+)
+
+def invalidate_principal(user_id: str):
+    """Drop a cached member after it has been updated or deleted"""
+    principal_cache.invalidate(user_id)
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
@@ -31,7 +46,12 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    # Get user from database
+    # Get user from cache, falling back to the database. Handlers get
+    # their own copy so changes to it never leak into other requests
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return copy.deepcopy(user)
+    
     db = await get_database()
     user = await db.members.find_one({"_id": user_id})
     
@@ -41,7 +61,8 @@ async def get_current_user(
             detail="User not found"
         )
     
-    return user
+    principal_cache.set(user_id, user)
+    return copy.deepcopy(user)
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     """Ensure user has active subscription"""
@@ -2,7 +2,7 @@
 Pydantic models for books
 """
 
-from typing import List, Optional, Any, Annotated
+from typing import Dict, List, Optional, Any, Annotated
 from pydantic import BaseModel, Field, BeforeValidator
 
 # Helper to convert ObjectId to str
@@ -24,6 +24,21 @@ class BookBase(BaseModel):
 class BookCreate(BookBase):
     pass
 
+def _parse_copies(value: Any) -> Any:
+    """CSV imports write copies as "HN:2; HP:1" """
+    if isinstance(value, str):
+        copies = {}
+        for part in value.split(";"):
+            if part.strip():
+                branch_id, _, count = part.partition(":")
+                copies[branch_id.strip()] = count.strip() or 1
+        return copies
+    return value
+
+class BookImportRow(BookCreate):
+    # Branch id -> number of copies to shelve there
+    copies: Annotated[Dict[str, Annotated[int, Field(ge=0, le=1000)]], BeforeValidator(_parse_copies)] = {}
+
 class BookUpdate(BaseModel):
     isbn: Optional[str] = None
     title: Optional[str] = None
@@ -37,8 +52,13 @@ class BookUpdate(BaseModel):
     pages: Optional[int] = None
     language: Optional[str] = None
 
+class BranchAvailability(BaseModel):
+    available: int = 0
+    total: int = 0
+
 class BookResponse(BookBase):
     id: PyObjectId = Field(alias="_id")
+    availability: Dict[str, BranchAvailability] = {}
     
     class Config:
         populate_by_name = True
@@ -49,6 +69,25 @@ class BookResponse(BookBase):
 class BookSearchResult(BookResponse):
     score: Optional[float] = None
 
+class FacetBucket(BaseModel):
+    value: Any
+    count: int
+    name: Optional[str] = None  # lccName for lccCode buckets
+
+class BookFacetPage(BaseModel):
+    items: List[BookResponse]
+    facets: Dict[str, List[FacetBucket]]
+
+class BookSearchFacetPage(BaseModel):
+    items: List[BookSearchResult]
+    facets: Dict[str, List[FacetBucket]]
+
+class BookSuggestion(BaseModel):
+    text: str
+    type: str  # title, author or subject
+    bookId: Optional[str] = None
+    score: int
+
 class CopyResponse(BaseModel):
     id: PyObjectId = Field(alias="_id")
     bookId: str
@@ -3,7 +3,7 @@ Pydantic models for loans and transactions
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class LoanCreate(BaseModel):
@@ -30,9 +30,27 @@ class TransactionResponse(BaseModel):
     branchId: str
     type: str
     memberId: str
-    copyId: str
+    copyId: Optional[str] = None  # fine transactions have no copy
     loanId: str
     createdAt: datetime
     
     class Config:
         populate_by_name = True
+
+class LoanBatchOperation(BaseModel):
+    op: Literal["borrow", "return", "renew"]
+    copyId: Optional[str] = None  # borrow
+    loanId: Optional[str] = None  # return / renew
+
+class LoanBatchRequest(BaseModel):
+    memberId: Optional[str] = None
+    branchId: Optional[str] = None
+    operations: List[LoanBatchOperation] = Field(..., min_length=1, max_length=100)
+
+class LoanBatchItemResult(BaseModel):
+    index: int
+    op: str
+    ok: bool
+    status: int
+    detail: Optional[str] = None
+    loan: Optional[LoanResponse] = None
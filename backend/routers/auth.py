@@ -4,8 +4,10 @@ Authentication Router
 
 from fastapi import APIRouter, HTTPException, status, Depends
 from models.auth import UserLogin, UserRegister, Token, UserResponse
-from utils.security import hash_password, verify_password, create_access_token
+from utils.security import hash_password_async, verify_password_async, create_access_token
 from database import get_database
+from utils.sequence import generate_id
+from services.events import event_bus, MEMBER_UPDATED
 from middleware.auth import get_current_user
 from datetime import datetime
 
@@ -25,14 +27,13 @@ async def register(user_data: UserRegister):
         )
     
     # Generate user ID
-    count = await db.members.count_documents({})
-    user_id = f"MEM{str(count + 1).zfill(6)}"
+    user_id = await generate_id(db, "members")
     
     # Create user document
     user_doc = {
         "_id": user_id,
         "email": user_data.email,
-        "passwordHash": hash_password(user_data.password),
+        "passwordHash": await hash_password_async(user_data.password),
         "fullName": user_data.fullName,
         "phone": user_data.phone,
         "branchId": user_data.branchId,
@@ -45,10 +46,12 @@ async def register(user_data: UserRegister):
             "maxLoans": 5,
             "loanDuration": 14
         },
-        "joinedAt": datetime.now()
+        "joinedAt": datetime.now(),
+        "activeLoans": 0
     }
     
     await db.members.insert_one(user_doc)
+    await event_bus.publish(MEMBER_UPDATED, memberId=user_doc["_id"])
     
     return user_doc
 
@@ -60,7 +63,7 @@ async def login(credentials: UserLogin):
     # Find user by email
     user = await db.members.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["passwordHash"]):
+    if not user or not await verify_password_async(credentials.password, user["passwordHash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -2,56 +2,129 @@
 Books Router - Catalog and Search
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
-from models.book import BookResponse, BookSearchResult, CopyResponse, DigitalLicenseResponse, BookCreate, BookUpdate, CopyCreate
+from fastapi import APIRouter, HTTPException, Query, Depends, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+import io
+import json
+from typing import List, Optional, Union
+from models.book import BookResponse, BookSearchResult, BookSuggestion, BookFacetPage, BookSearchFacetPage, CopyResponse, DigitalLicenseResponse, BookCreate, BookUpdate, CopyCreate
 from database import get_database
+from utils.sequence import generate_id, generate_copy_barcode
+from utils.pagination import fetch_page, page_stages, set_next_cursor
+from services.catalog_cache import catalog_cache
+from services.search import search_backend, search_fields, FIELD_WEIGHTS
+from services.fuzzy import fuzzy_search
+from services.suggest import suggester
+from services.facets import facet_counts, facet_page, parse_facets
+from services.events import event_bus, BOOK_UPDATED, COPY_STATUS_CHANGED
+from services.availability import add_copy, available_at, available_field
+from services.catalog_import import CatalogImport, FORMATS, read_rows
+from config import settings
 from middleware.auth import get_current_user
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
-@router.get("/search", response_model=List[BookSearchResult])
+FACETS_DESCRIPTION = "Comma-separated facet counts to include: lccCode,language,publishedYear"
+
+def book_filter(lccCode: Optional[str], language: Optional[str], availableAt: Optional[str]) -> dict:
+    """Filters shared by the book list and the books export"""
+    filter_query = {}
+    if lccCode:
+        filter_query["lccCode"] = lccCode
+    if language:
+        filter_query["language"] = language
+    if availableAt:
+        filter_query.update(available_at(availableAt))
+    return filter_query
+
+async def _run_search(backend, db, q: str, limit: int, facet_names: List[str], filter_query: dict):
+    if facet_names:
+        return await backend.facet_search(db, q, limit, facet_names, filter_query)
+    return await backend.search(db, q, limit, filter_query), None
+
+@router.get("/search", response_model=Union[List[BookSearchResult], BookSearchFacetPage])
 async def search_books(
+    response: Response,
     q: str = Query(..., min_length=1, description="Search query"),
-    limit: int = Query(50, le=100)
+    limit: int = Query(50, le=100),
+    fuzzy: bool = Query(False, description="Tolerate typos in title and author words"),
+    facets: Optional[str] = Query(None, description=FACETS_DESCRIPTION),
+    availableAt: Optional[str] = Query(None, description="Only books with a copy on the shelf at this branch")
 ):
     """Full-text search for books"""
     db = await get_database()
+    facet_names = parse_facets(facets)
+    filter_query = available_at(availableAt) if availableAt else None
     
-    # Full-text search with score
-    cursor = db.books.find(
-        {"$text": {"$search": q}},
-        {"score": {"$meta": "textScore"}}
-    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+    # Ranked by $text score or BM25, depending on SEARCH_BACKEND
+    mode = "exact"
+    books, counts = [], None
+    if not (fuzzy and fuzzy_search.ready):
+        books, counts = await _run_search(search_backend, db, q, limit, facet_names, filter_query)
     
-    books = await cursor.to_list(length=limit)
+    # Typo-tolerant pass when asked for, or when nothing matched exactly
+    if not books and fuzzy_search.ready:
+        books, counts = await _run_search(fuzzy_search, db, q, limit, facet_names, filter_query)
+        mode = "fuzzy"
+    response.headers["X-Search-Mode"] = mode
     
     # Add score to results
     for book in books:
         book["score"] = book.get("score", 0)
     
+    # Facets wrap the page together with counts over every match
+    if facet_names:
+        return {"items": books, "facets": counts}
     return books
 
-@router.get("/", response_model=List[BookResponse])
+@router.get("/suggest", response_model=List[BookSuggestion])
+async def suggest_books(
+    prefix: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=20)
+):
+    """Autocomplete titles, authors and subjects, most borrowed first"""
+    # Served from memory; no database round trip
+    return suggester.suggest(prefix, limit)
+
+@router.get("/", response_model=Union[List[BookResponse], BookFacetPage])
 async def get_books(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from X-Next-Cursor"),
     lccCode: Optional[str] = None,
-    language: Optional[str] = None
+    language: Optional[str] = None,
+    availableAt: Optional[str] = Query(None, description="Only books with a copy on the shelf at this branch"),
+    sortBy: Optional[str] = Query(None, pattern="^availability$", description="availability: most available copies at availableAt first"),
+    facets: Optional[str] = Query(None, description=FACETS_DESCRIPTION)
 ):
     """Get books with pagination and filters"""
     db = await get_database()
+    facet_names = parse_facets(facets)
     
     # Build filter
-    filter_query = {}
-    if lccCode:
-        filter_query["lccCode"] = lccCode
-    if language:
-        filter_query["language"] = language
+    filter_query = book_filter(lccCode, language, availableAt)
+    
+    # Availability sorting uses the per-branch index on the embedded summary
+    sort_field = "_id"
+    if sortBy == "availability":
+        if not availableAt:
+            raise HTTPException(status_code=400, detail="sortBy=availability requires availableAt")
+        sort_field = available_field(availableAt)
+    
+    # Filtered facets: the page and the counts from one $facet aggregation
+    if facet_names and filter_query:
+        books, counts = await facet_page(
+            db, filter_query, page_stages(sort_field, limit, skip, cursor), facet_names
+        )
+        set_next_cursor(response, books, sort_field, limit)
+        return {"items": books, "facets": counts}
     
-    cursor = db.books.find(filter_query).sort("_id", -1).skip(skip).limit(limit)
-    books = await cursor.to_list(length=limit)
+    books = await fetch_page(db.books, filter_query, sort_field, limit, skip, cursor, response)
     
+    # Unfiltered counts cover the whole catalog and come from the shared cache
+    if facet_names:
+        return {"items": books, "facets": await facet_counts.get(db, facet_names)}
     return books
 
 @router.get("/categories/list")
@@ -59,24 +132,19 @@ async def get_categories():
     """Get list of book categories with counts"""
     db = await get_database()
     
-    pipeline = [
-        {"$group": {
-            "_id": "$lccCode",
-            "name": {"$first": "$lccName"},
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}}
+    # Same buckets as the lccCode facet, cached instead of regrouped per call
+    buckets = (await facet_counts.get(db, ["lccCode"]))["lccCode"]
+    return [
+        {"_id": bucket["value"], "name": bucket.get("name"), "count": bucket["count"]}
+        for bucket in buckets
     ]
-    
-    categories = await db.books.aggregate(pipeline).to_list(length=100)
-    return categories
 
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(book_id: str):
     """Get book by ID"""
     db = await get_database()
     
-    book = await db.books.find_one({"_id": book_id})
+    book = await catalog_cache.get_book(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
@@ -91,15 +159,14 @@ async def get_book_copies(
     """Get physical copies of a book"""
     db = await get_database()
     
-    # Build filter
-    filter_query = {"bookId": book_id}
+    # Filter the cached per-book list in memory
+    copies = await catalog_cache.get_copies(db, book_id)
     if branchId:
-        filter_query["branchId"] = branchId
+        copies = [c for c in copies if c["branchId"] == branchId]
     if status:
-        filter_query["status"] = status
+        copies = [c for c in copies if c["status"] == status]
     
-    copies = await db.copies.find(filter_query).to_list(length=100)
-    return copies
+    return copies[:100]
 
 @router.post("/{book_id}/copies", response_model=CopyResponse, status_code=201)
 async def create_copy(book_id: str, copy: CopyCreate, current_user: dict = Depends(get_current_user)):
@@ -110,14 +177,12 @@ async def create_copy(book_id: str, copy: CopyCreate, current_user: dict = Depen
     db = await get_database()
     
     # Verify book exists
-    book = await db.books.find_one({"_id": book_id})
+    book = await catalog_cache.get_book(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
         
     # Generate unique barcode (e.g., BK001-C001)
-    # Count existing copies for this book to append suffix
-    count = await db.copies.count_documents({"bookId": book_id})
-    barcode = f"{book_id}-C{str(count + 1).zfill(3)}"
+    barcode = await generate_copy_barcode(db, book_id)
     
     # Create copy document
     copy_doc = {
@@ -134,6 +199,8 @@ async def create_copy(book_id: str, copy: CopyCreate, current_user: dict = Depen
     }
     
     await db.copies.insert_one(copy_doc)
+    await add_copy(db, copy_doc)
+    await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[book_id])
     
     created_copy = await db.copies.find_one({"_id": barcode})
     return created_copy
@@ -143,7 +210,7 @@ async def get_digital_license(book_id: str):
     """Get digital license for a book"""
     db = await get_database()
     
-    license = await db.digital_licenses.find_one({"bookId": book_id})
+    license = await catalog_cache.get_license(db, book_id)
     return license
 
 
@@ -163,16 +230,50 @@ async def create_book(book: BookCreate, current_user: dict = Depends(get_current
     book_dict = book.model_dump(by_alias=True)
     
     # Generate custom ID (BKxxxx)
-    count = await db.books.count_documents({})
-    book_id = f"BK{str(count + 1).zfill(3)}"
+    book_id = await generate_id(db, "books")
     book_dict["_id"] = book_id
+    book_dict["search"] = search_fields(book_dict)
+    book_dict["availability"] = {}
     
     # Insert book
     await db.books.insert_one(book_dict)
-    created_book = await db.books.find_one({"_id": book_id})
+    await event_bus.publish(BOOK_UPDATED, bookIds=[book_id])
     
+    created_book = await db.books.find_one({"_id": book_id})
     return created_book
 
+@router.post("/import")
+async def import_books(
+    file: UploadFile = File(..., description="JSONL or CSV, one book per row (BookCreate fields plus copies)"),
+    format: Optional[str] = Query(None, pattern="^(jsonl|csv)$", description="Default: from the file extension"),
+    updateExisting: bool = Query(False, description="Overwrite books whose ISBN is already in the catalog"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk import books and their copies (Admin only).
+    
+    Streams NDJSON: a progress line per chunk with the rows that failed,
+    then a summary line.
+    """
+    if current_user["role"].lower() != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    fmt = format or (file.filename or "").rsplit(".", 1)[-1].lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="Cannot tell the file format; pass format=jsonl or format=csv")
+    
+    db = await get_database()
+    job = CatalogImport(db, update_existing=updateExisting, chunk_size=settings.IMPORT_CHUNK_SIZE)
+    # The upload is already spooled to disk; rows are read a chunk at a time
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    
+    async def events():
+        async for event in job.run(read_rows(stream, fmt)):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.put("/{book_id}", response_model=BookResponse)
 async def update_book(book_id: str, book_update: BookUpdate, current_user: dict = Depends(get_current_user)):
     """Update a book (Admin only)"""
@@ -189,11 +290,16 @@ async def update_book(book_id: str, book_update: BookUpdate, current_user: dict
     # Update fields
     update_data = book_update.model_dump(exclude_unset=True)
     
+    # Keep the folded search fields in step with the text they derive from
+    if any(field in update_data for field in FIELD_WEIGHTS):
+        update_data["search"] = search_fields({**existing_book, **update_data})
+    
     if update_data:
         await db.books.update_one(
             {"_id": book_id},
             {"$set": update_data}
         )
+        await event_bus.publish(BOOK_UPDATED, bookIds=[book_id])
     
     updated_book = await db.books.find_one({"_id": book_id})
     return updated_book
@@ -213,5 +319,6 @@ async def delete_book(book_id: str, current_user: dict = Depends(get_current_use
     
     # Delete book
     await db.books.delete_one({"_id": book_id})
+    await event_bus.publish(BOOK_UPDATED, bookIds=[book_id])
     
     return None
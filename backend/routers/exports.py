@@ -0,0 +1,148 @@
+"""
+Exports Router - Streaming NDJSON/CSV downloads (Admin only)
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from datetime import datetime
+from database import get_database
+from config import settings
+from middleware.auth import get_current_user
+from utils.export import export_response, parse_fields
+from routers.books import book_filter
+from routers.loans import loan_list_filter
+from routers.transactions import transaction_filter
+from routers.users import check_admin, user_filter
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+# Default CSV columns; NDJSON writes every projected field
+COLUMNS = {
+    "books": ["_id", "isbn", "title", "authors", "lccCode", "lccName", "subjects",
+              "publisher", "publishedYear", "pages", "language"],
+    "copies": ["_id", "bookId", "branchId", "barcode", "status", "condition"],
+    "loans": ["_id", "branchId", "memberId", "copyId", "bookId", "borrowedAt", "dueAt",
+              "returnedAt", "status", "renewCount", "overdueDays", "fineAmount"],
+    "transactions": ["_id", "branchId", "type", "memberId", "copyId", "loanId", "amount", "createdAt"],
+    "members": ["_id", "email", "fullName", "phone", "branchId", "role", "subscription"],
+}
+
+# Collections holding credentials export only these top-level fields,
+# whatever `fields` asks for, so a new sensitive field stays private
+EXPORTABLE_FIELDS = {
+    "members": {"_id", "email", "fullName", "phone", "branchId", "role", "subscription",
+                "joinedAt", "address", "activeLoans", "walletBalance"},
+}
+# Left out unless asked for by name
+HIDDEN_FIELDS = {"books": {"search"}}
+
+class ExportOptions:
+    def __init__(
+        self,
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        gzip: bool = Query(False, description="Compress the download"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to export (default: all)")
+    ):
+        self.format = format
+        self.gzip = gzip
+        self.fields = parse_fields(fields)
+
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    check_admin(current_user)
+    return current_user
+
+def _stream(db, collection: str, filter_query: dict, options: ExportOptions, sort_field: str = "_id"):
+    """Project, sort and stream one collection"""
+    allowed = EXPORTABLE_FIELDS.get(collection)
+    if options.fields:
+        columns = [field for field in options.fields if allowed is None or field.split(".")[0] in allowed]
+        if not columns:
+            raise HTTPException(status_code=400, detail="No exportable fields requested")
+        projection = {field: 1 for field in columns}
+        if "_id" not in columns:
+            projection["_id"] = 0
+    else:
+        columns = COLUMNS[collection]
+        if allowed is not None:
+            projection = {field: 1 for field in allowed}
+        else:
+            projection = {field: 0 for field in HIDDEN_FIELDS.get(collection, set())} or None
+
+    # Motor fetches batch_size documents per getMore and the response is
+    # flushed once per batch, so memory stays flat however large the export
+    cursor = (
+        db[collection]
+        .find(filter_query, projection)
+        .sort(sort_field, 1)
+        .batch_size(settings.EXPORT_BATCH_SIZE)
+    )
+    name = f"{collection}-{datetime.now():%Y%m%d-%H%M%S}"
+    return export_response(cursor, name, options.format, columns, settings.EXPORT_BATCH_SIZE, options.gzip)
+
+@router.get("/books")
+async def export_books(
+    lccCode: Optional[str] = None,
+    language: Optional[str] = None,
+    availableAt: Optional[str] = None,
+    options: ExportOptions = Depends(),
+    current_user: dict = Depends(require_admin)
+):
+    """Export the catalog (filters as in GET /books/)"""
+    db = await get_database()
+    return _stream(db, "books", book_filter(lccCode, language, availableAt), options)
+
+@router.get("/copies")
+async def export_copies(
+    bookId: Optional[str] = None,
+    branchId: Optional[str] = None,
+    status: Optional[str] = None,
+    options: ExportOptions = Depends(),
+    current_user: dict = Depends(require_admin)
+):
+    """Export physical copies (filters as in GET /books/{book_id}/copies)"""
+    db = await get_database()
+    filter_query = {}
+    if bookId:
+        filter_query["bookId"] = bookId
+    if branchId:
+        filter_query["branchId"] = branchId
+    if status:
+        filter_query["status"] = status
+    return _stream(db, "copies", filter_query, options)
+
+@router.get("/loans")
+async def export_loans(
+    status: Optional[str] = None,
+    branchId: Optional[str] = None,
+    options: ExportOptions = Depends(),
+    current_user: dict = Depends(require_admin)
+):
+    """Export loans (filters as in GET /loans/)"""
+    db = await get_database()
+    return _stream(db, "loans", loan_list_filter(status, branchId), options, "borrowedAt")
+
+@router.get("/transactions")
+async def export_transactions(
+    branchId: Optional[str] = None,
+    memberId: Optional[str] = None,
+    type: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from", description="Start of createdAt range (default: last 30 days)"),
+    to: Optional[datetime] = Query(None, description="End of createdAt range (exclusive)"),
+    options: ExportOptions = Depends(),
+    current_user: dict = Depends(require_admin)
+):
+    """Export transactions within a time window (filters as in GET /transactions/)"""
+    db = await get_database()
+    filter_query = transaction_filter(current_user, branchId, memberId, type, from_, to)
+    return _stream(db, "transactions", filter_query, options, "createdAt")
+
+@router.get("/members")
+async def export_members(
+    q: Optional[str] = None,
+    role: Optional[str] = None,
+    options: ExportOptions = Depends(),
+    current_user: dict = Depends(require_admin)
+):
+    """Export members without credentials (filters as in GET /users/)"""
+    db = await get_database()
+    return _stream(db, "members", user_filter(q, role), options)
@@ -2,15 +2,25 @@
 Loans Router - Borrow and Return Operations
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from models.loan import LoanCreate, LoanResponse, TransactionResponse
+from models.loan import LoanCreate, LoanResponse, TransactionResponse, LoanBatchRequest, LoanBatchItemResult
 from database import get_database
 from middleware.auth import get_current_active_user
-from datetime import datetime, timedelta
+from services import circulation
+from utils.pagination import fetch_page
 
 router = APIRouter(prefix="/loans", tags=["Loans"])
 
+def loan_list_filter(status: Optional[str], branchId: Optional[str]) -> dict:
+    """Filters shared by the loan list and the loans export"""
+    filter_query = {}
+    if status:
+        filter_query["status"] = status
+    if branchId:
+        filter_query["branchId"] = branchId
+    return filter_query
+
 @router.post("/borrow", response_model=LoanResponse, status_code=201)
 async def borrow_book(
     loan_data: LoanCreate,
@@ -18,87 +28,16 @@ async def borrow_book(
 ):
     """Borrow a physical book"""
     db = await get_database()
-    
-    # Check if user has reached max loans
-    active_loans = await db.loans.count_documents({
-        "memberId": current_user["_id"],
-        "status": {"$in": ["active", "overdue"]}
-    })
-    
-    max_loans = current_user["subscription"]["maxLoans"]
-    if active_loans >= max_loans:
-        raise HTTPException(
-            status_code=400,
-            detail=f"You have reached the maximum number of loans ({max_loans})"
-        )
-    
-    # Check if subscription is expired
-    if current_user["subscription"]["endDate"] and current_user["subscription"]["endDate"] < datetime.now():
-        raise HTTPException(
-            status_code=403,
-            detail="Your subscription has expired. Please renew."
-        )
+    return await circulation.borrow(db, current_user, loan_data.copyId)
 
-    # Check if copy exists and is available
-    copy = await db.copies.find_one({"_id": loan_data.copyId})
-    if not copy:
-        raise HTTPException(status_code=404, detail="Copy not found")
-    
-    if copy["status"] != "available":
-        raise HTTPException(status_code=400, detail="Copy is not available")
-    
-    # Check if copy is in user's branch
-    if copy["branchId"] != current_user["branchId"]:
-        raise HTTPException(
-            status_code=400,
-            detail=f"This copy is only available at {copy['branchId']} branch"
-        )
-    
-    # Create loan
-    loan_count = await db.loans.count_documents({})
-    loan_id = f"LN{str(loan_count + 1).zfill(6)}"
-    
-    borrowed_at = datetime.now()
-    due_at = borrowed_at + timedelta(days=current_user["subscription"]["loanDuration"])
-    
-    loan_doc = {
-        "_id": loan_id,
-        "branchId": current_user["branchId"],
-        "memberId": current_user["_id"],
-        "copyId": copy["_id"],
-        "bookId": copy["bookId"],
-        "borrowedAt": borrowed_at,
-        "dueAt": due_at,
-        "returnedAt": None,
-        "status": "active",
-        "renewCount": 0
-    }
-    
-    await db.loans.insert_one(loan_doc)
-    
-    # Update copy status
-    await db.copies.update_one(
-        {"_id": copy["_id"]},
-        {"$set": {"status": "borrowed"}}
-    )
-    
-    # Create transaction
-    tx_count = await db.transactions.count_documents({})
-    tx_id = f"TX{str(tx_count + 1).zfill(8)}"
-    
-    transaction_doc = {
-        "_id": tx_id,
-        "branchId": current_user["branchId"],
-        "type": "borrow",
-        "memberId": current_user["_id"],
-        "copyId": copy["_id"],
-        "loanId": loan_id,
-        "createdAt": borrowed_at
-    }
-    
-    await db.transactions.insert_one(transaction_doc)
-    
-    return loan_doc
+@router.post("/borrow-book/{book_id}", response_model=LoanResponse, status_code=201)
+async def borrow_any_copy(
+    book_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Borrow any available copy of a book at the member's branch"""
+    db = await get_database()
+    return await circulation.borrow_book(db, current_user, book_id)
 
 @router.post("/return/{loan_id}", response_model=LoanResponse)
 async def return_book(
@@ -107,85 +46,7 @@ async def return_book(
 ):
     """Return a borrowed book"""
     db = await get_database()
-    
-    # Find loan
-    loan = await db.loans.find_one({"_id": loan_id})
-    if not loan:
-        raise HTTPException(status_code=404, detail="Loan not found")
-    
-    # Check authorization
-    if loan["memberId"] != current_user["_id"] and current_user["role"] not in ["STAFF", "ADMIN"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    if loan["status"] == "returned":
-        raise HTTPException(status_code=400, detail="Book already returned")
-    
-    # Calculate Fine
-    return_date = datetime.now()
-    fine_amount = 0
-    overdue_days = 0
-    
-    if return_date > loan["dueAt"]:
-        delta = return_date - loan["dueAt"]
-        overdue_days = delta.days
-        if overdue_days > 0:
-            fine_amount = overdue_days * 5000 # 5000 VND per day
-    
-    # Update loan
-    update_data = {
-        "returnedAt": return_date,
-        "status": "returned",
-        "overdueDays": overdue_days,
-        "fineAmount": fine_amount
-    }
-    
-    await db.loans.update_one(
-        {"_id": loan_id},
-        {"$set": update_data}
-    )
-    
-    # Update copy status
-    await db.copies.update_one(
-        {"_id": loan["copyId"]},
-        {"$set": {"status": "available"}}
-    )
-    
-    # Generate Transaction ID
-    tx_count = await db.transactions.count_documents({})
-    
-    # Create return transaction
-    tx_id_return = f"TX{str(tx_count + 1).zfill(8)}"
-    
-    transaction_doc = {
-        "_id": tx_id_return,
-        "branchId": loan["branchId"],
-        "type": "return",
-        "memberId": loan["memberId"],
-        "copyId": loan["copyId"],
-        "loanId": loan_id,
-        "createdAt": return_date
-    }
-    await db.transactions.insert_one(transaction_doc)
-    
-    # Create Fine Transaction if applicable
-    if fine_amount > 0:
-        tx_id_fine = f"TX{str(tx_count + 2).zfill(8)}"
-        fine_doc = {
-             "_id": tx_id_fine,
-             "branchId": loan["branchId"],
-             "type": "fine",
-             "memberId": loan["memberId"],
-             "loanId": loan_id,
-             "amount": fine_amount,
-             "description": f"Overdue fine for {overdue_days} days",
-             "status": "pending", # User needs to pay this
-             "createdAt": return_date
-        }
-        await db.transactions.insert_one(fine_doc)
-    
-    # Get updated loan
-    updated_loan = await db.loans.find_one({"_id": loan_id})
-    return updated_loan
+    return await circulation.return_loan(db, loan_id, current_user)
 
 @router.post("/renew/{loan_id}", response_model=LoanResponse)
 async def renew_loan(
@@ -194,68 +55,30 @@ async def renew_loan(
 ):
     """Renew a loan (extend due date)"""
     db = await get_database()
-    
-    # Find loan
-    loan = await db.loans.find_one({"_id": loan_id})
-    if not loan:
-        raise HTTPException(status_code=404, detail="Loan not found")
-    
-    # Check authorization
-    if loan["memberId"] != current_user["_id"] and current_user["role"].lower() not in ["staff", "admin"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    if loan["status"] == "returned":
-        raise HTTPException(status_code=400, detail="Cannot renew returned book")
-    
-    # Check renew count (max 2 renewals)
-    renew_count = loan.get("renewCount", 0)
-    if renew_count >= 2:
-        raise HTTPException(status_code=400, detail="Maximum renewal limit reached (2 times)")
-    
-    # Check if overdue by more than 3 days
-    current_date = datetime.now()
-    if current_date > loan["dueAt"]:
-        days_overdue = (current_date - loan["dueAt"]).days
-        if days_overdue > 3:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Cannot renew: Book is overdue by {days_overdue} days. Please return it."
-            )
-    
-    # Calculate new due date (add 14 days from current due date)
-    new_due_date = loan["dueAt"] + timedelta(days=14)
-    
-    # Update loan
-    await db.loans.update_one(
-        {"_id": loan_id},
-        {
-            "$set": {
-                "dueAt": new_due_date,
-                "renewCount": renew_count + 1,
-                "status": "active"  # Reset to active if was overdue
-            }
-        }
-    )
-    
-    # Create renewal transaction
-    tx_count = await db.transactions.count_documents({})
-    tx_id = f"TX{str(tx_count + 1).zfill(8)}"
-    
-    transaction_doc = {
-        "_id": tx_id,
-        "branchId": loan["branchId"],
-        "type": "renew",
-        "memberId": loan["memberId"],
-        "copyId": loan["copyId"],
-        "loanId": loan_id,
-        "createdAt": current_date,
-        "description": f"Renewal #{renew_count + 1}"
-    }
-    await db.transactions.insert_one(transaction_doc)
-    
-    # Get updated loan
-    updated_loan = await db.loans.find_one({"_id": loan_id})
-    return updated_loan
+    return await circulation.renew(db, loan_id, current_user)
+
+@router.post("/batch", response_model=List[LoanBatchItemResult])
+async def batch_loans(
+    batch: LoanBatchRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Apply many borrow/return/renew operations in one request (circulation desk)"""
+    db = await get_database()
+    is_staff = current_user["role"].lower() in ["staff", "admin"]
+    
+    # Resolve the member the batch acts for
+    member = current_user
+    if batch.memberId and batch.memberId != current_user["_id"]:
+        if not is_staff:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        member = await db.members.find_one({"_id": batch.memberId})
+        if not member:
+            raise HTTPException(status_code=404, detail="Member not found")
+    elif not batch.memberId and is_staff:
+        # Branch mode: staff processing a pile of returns/renewals
+        member = None
+    
+    return await circulation.run_batch(db, current_user, member, batch.branchId, batch.operations)
 
 @router.get("/my-loans", response_model=List[LoanResponse])
 async def get_my_loans(
@@ -274,8 +97,10 @@ async def get_my_loans(
 
 @router.get("/", response_model=List[LoanResponse])
 async def get_all_loans(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from X-Next-Cursor"),
     status: Optional[str] = None,
     branchId: Optional[str] = None,
     current_user: dict = Depends(get_current_active_user)
@@ -285,14 +110,9 @@ async def get_all_loans(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     db = await get_database()
-    filter_query = {}
-    if status:
-        filter_query["status"] = status
-    if branchId:
-        filter_query["branchId"] = branchId
+    filter_query = loan_list_filter(status, branchId)
         
-    cursor = db.loans.find(filter_query).sort("borrowedAt", -1).skip(skip).limit(limit)
-    loans = await cursor.to_list(length=limit)
+    loans = await fetch_page(db.loans, filter_query, "borrowedAt", limit, skip, cursor, response)
     return loans
 
 @router.get("/{loan_id}", response_model=LoanResponse)
@@ -2,39 +2,32 @@
 Statistics Router - Aggregation Pipelines for Dashboard
 """
 
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from database import get_database
-from middleware.auth import get_current_user
-from datetime import datetime, timedelta
+from middleware.auth import get_current_user, principal_cache
+from utils.security import password_pool_stats
+from utils.sequence import sequences
+from services.overdue import overdue_sweeper
+from services.txlog import transaction_log
+from services.catalog_cache import catalog_cache
+from services.search import search_backend
+from services.fuzzy import fuzzy_search
+from services.suggest import suggester
+from services.facets import facet_counts
+from services.dashboard import dashboard_stats
+from services.events import event_bus
+from services.branch_stats import branch_performance
+from services.daily_stats import transaction_trends
+from services.leaderboard import leaderboard
 
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
 @router.get("/dashboard")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    """Get comprehensive dashboard statistics"""
+    """Get comprehensive dashboard statistics (snapshot, see snapshotAgeSeconds)"""
     db = await get_database()
-    
-    # Total counts
-    total_books = await db.books.count_documents({})
-    total_copies = await db.copies.count_documents({})
-    total_members = await db.members.count_documents({})
-    total_loans = await db.loans.count_documents({})
-    
-    # Active loans
-    active_loans = await db.loans.count_documents({"status": {"$in": ["active", "overdue"]}})
-    
-    # Available copies
-    available_copies = await db.copies.count_documents({"status": "available"})
-    
-    return {
-        "totalBooks": total_books,
-        "totalCopies": total_copies,
-        "totalMembers": total_members,
-        "totalLoans": total_loans,
-        "activeLoans": active_loans,
-        "availableCopies": available_copies
-    }
+    return await dashboard_stats.get(db)
 
 @router.get("/books-by-category")
 async def get_books_by_category():
@@ -75,56 +68,21 @@ async def get_loans_by_branch():
     return results
 
 @router.get("/transaction-trends")
-async def get_transaction_trends(days: int = Query(30, le=365)):
-    """Get transaction trends over time"""
+async def get_transaction_trends(days: int = Query(30, le=365), branchId: Optional[str] = None):
+    """Get transaction trends over time (local days, from the daily_stats rollup)"""
     db = await get_database()
-    
-    start_date = datetime.now() - timedelta(days=days)
-    
-    pipeline = [
-        {"$match": {"createdAt": {"$gte": start_date}}},
-        {"$group": {
-            "_id": {
-                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$createdAt"}},
-                "type": "$type"
-            },
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id.date": 1}}
-    ]
-    
-    results = await db.transactions.aggregate(pipeline).to_list(length=1000)
-    return results
+    return await transaction_trends(db, days, branchId)
 
 @router.get("/top-borrowed-books")
-async def get_top_borrowed_books(limit: int = Query(10, le=50)):
-    """Get most borrowed books"""
+async def get_top_borrowed_books(
+    limit: int = Query(10, ge=1, le=50),
+    days: Optional[int] = Query(None, ge=1, le=365, description="Rolling window in days, e.g. 7, 30 or 365 (default: all time)"),
+    branchId: Optional[str] = None,
+    lccCode: Optional[str] = None
+):
+    """Get most borrowed books, overall or over the last `days` days"""
     db = await get_database()
-    
-    pipeline = [
-        {"$group": {
-            "_id": "$bookId",
-            "borrowCount": {"$sum": 1}
-        }},
-        {"$sort": {"borrowCount": -1}},
-        {"$limit": limit},
-        {"$lookup": {
-            "from": "books",
-            "localField": "_id",
-            "foreignField": "_id",
-            "as": "book"
-        }},
-        {"$unwind": "$book"},
-        {"$project": {
-            "bookId": "$_id",
-            "title": "$book.title",
-            "authors": "$book.authors",
-            "borrowCount": 1
-        }}
-    ]
-    
-    results = await db.loans.aggregate(pipeline).to_list(length=limit)
-    return results
+    return await leaderboard.top(db, limit, days, branchId, lccCode)
 
 @router.get("/member-activity")
 async def get_member_activity():
@@ -148,35 +106,28 @@ async def get_member_activity():
 
 @router.get("/branch-performance")
 async def get_branch_performance():
-    """Get comprehensive branch performance metrics"""
+    """Get comprehensive branch performance metrics for every branch"""
     db = await get_database()
+    return await branch_performance(db)
+
+@router.get("/runtime")
+async def get_runtime_stats(current_user: dict = Depends(get_current_user)):
+    """Get in-process cache and worker pool counters for this worker (Admin/Staff only)"""
+    if current_user["role"].lower() not in ["admin", "staff"]:
+        raise HTTPException(status_code=403, detail="Admin or staff access required")
     
-    branches = await db.branches.find({}).to_list(length=10)
-    
-    performance = []
-    for branch in branches:
-        branch_id = branch["_id"]
-        
-        # Get metrics
-        total_copies = await db.copies.count_documents({"branchId": branch_id})
-        available_copies = await db.copies.count_documents({"branchId": branch_id, "status": "available"})
-        total_members = await db.members.count_documents({"branchId": branch_id})
-        total_loans = await db.loans.count_documents({"branchId": branch_id})
-        active_loans = await db.loans.count_documents({
-            "branchId": branch_id,
-            "status": {"$in": ["active", "overdue"]}
-        })
-        
-        performance.append({
-            "branchId": branch_id,
-            "branchName": branch["name"],
-            "city": branch["city"],
-            "totalCopies": total_copies,
-            "availableCopies": available_copies,
-            "totalMembers": total_members,
-            "totalLoans": total_loans,
-            "activeLoans": active_loans,
-            "utilizationRate": round((total_copies - available_copies) / total_copies * 100, 2) if total_copies > 0 else 0
-        })
-    
-    return performance
+    return {
+        "principals": principal_cache.stats(),
+        "passwordPool": password_pool_stats(),
+        "sequences": sequences.stats(),
+        "overdueSweeper": overdue_sweeper.stats(),
+        "transactionLog": transaction_log.stats(),
+        "catalog": catalog_cache.stats(),
+        "search": search_backend.stats(),
+        "fuzzySearch": fuzzy_search.stats(),
+        "suggest": suggester.stats(),
+        "facets": facet_counts.stats(),
+        "dashboard": dashboard_stats.stats(),
+        "leaderboard": leaderboard.stats(),
+        "events": event_bus.stats()
+    }
@@ -2,41 +2,73 @@
 Transactions Router - History and Logs
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
+from datetime import datetime, timedelta
 from models.loan import TransactionResponse
 from database import get_database
+from config import settings
 from middleware.auth import get_current_active_user
+from utils.pagination import fetch_page
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+# Derived from the filter's shape, not the query plan: a hint for which
+# queries should reach one shard, not a report of what mongos did
+TARGETING_HEADER = "X-Query-Targeting-Hint"
+
+def transaction_filter(
+    current_user: dict,
+    branchId: Optional[str],
+    memberId: Optional[str],
+    type: Optional[str],
+    from_: Optional[datetime],
+    to: Optional[datetime]
+) -> dict:
+    """Filters shared by the transaction history and the transactions export"""
+    # Admin/Staff see every transaction, members only their own
+    filter_query = {}
+    
+    if current_user["role"].lower() not in ["admin", "staff"]:
+        filter_query["memberId"] = current_user["_id"]
+    elif memberId:
+        filter_query["memberId"] = memberId
+    
+    if branchId:
+        filter_query["branchId"] = branchId
+    if type:
+        filter_query["type"] = type
+    
+    # Always bound createdAt so queries use the shard key / (memberId, createdAt) index
+    if from_ is None:
+        from_ = (to or datetime.now()) - timedelta(days=settings.TRANSACTIONS_DEFAULT_WINDOW_DAYS)
+    created_range = {"$gte": from_}
+    if to is not None:
+        created_range["$lt"] = to
+    filter_query["createdAt"] = created_range
+    return filter_query
+
 @router.get("/", response_model=List[TransactionResponse])
 async def get_transactions(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from X-Next-Cursor"),
     branchId: Optional[str] = None,
+    memberId: Optional[str] = None,
     type: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from", description="Start of createdAt range (default: last 30 days)"),
+    to: Optional[datetime] = Query(None, description="End of createdAt range (exclusive)"),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Get transactions history"""
+    """Get transactions history within a time window"""
     db = await get_database()
+    filter_query = transaction_filter(current_user, branchId, memberId, type, from_, to)
     
-    # If not admin, can only see own transactions (optional requirement, but good practice)
-    # But usually this endpoint is for Admin Portal.
-    # Let's restrict to Admin/Staff for global view, or specific user if filter provided?
-    # For simplicity of this "Verification" task, allow Admin to see all, User to see theirs.
-    
-    filter_query = {}
-    
-    if current_user["role"] not in ["admin", "staff"]:
-        filter_query["memberId"] = current_user["_id"]
-    
-    if branchId:
-        filter_query["branchId"] = branchId
-    if type:
-        filter_query["type"] = type
+    # Shard key is {branchId, createdAt}: only a branch equality lets mongos
+    # target, and then only if the createdAt range falls within its chunks
+    response.headers[TARGETING_HEADER] = "shard-key" if branchId else "scatter-gather"
         
-    cursor = db.transactions.find(filter_query).sort("createdAt", -1).skip(skip).limit(limit)
-    transactions = await cursor.to_list(length=limit)
+    transactions = await fetch_page(db.transactions, filter_query, "createdAt", limit, skip, cursor, response)
     
     return transactions
@@ -2,26 +2,41 @@
 Users Router - Admin Management
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Response
 from typing import List, Optional
 from models.auth import UserResponse, UserUpdate, UserRegister
 from database import get_database
 from middleware.auth import get_current_user
+from utils.security import hash_password_async
+from utils.pagination import fetch_page
+from services.events import event_bus, MEMBER_UPDATED
 from bson import ObjectId
-from passlib.context import CryptContext
 
 router = APIRouter(prefix="/users", tags=["Users"], dependencies=[Depends(get_current_user)])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def check_admin(user: dict):
     role = user.get("role", "").lower()
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
+def user_filter(q: Optional[str], role: Optional[str]) -> dict:
+    """Filters shared by the user list and the members export"""
+    filter_query = {}
+    if q:
+        filter_query["$or"] = [
+            {"email": {"$regex": q, "$options": "i"}},
+            {"fullName": {"$regex": q, "$options": "i"}}
+        ]
+    if role:
+        filter_query["role"] = role
+    return filter_query
+
 @router.get("/")
 async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from X-Next-Cursor"),
     q: Optional[str] = None,
     role: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
@@ -29,18 +44,9 @@ async def get_users(
     """Get all users (Admin only)"""
     check_admin(current_user)
     db = await get_database()
-    
-    filter_query = {}
-    if q:
-        filter_query["$or"] = [
-            {"email": {"$regex": q, "$options": "i"}},
-            {"fullName": {"$regex": q, "$options": "i"}}
-        ]
-    if role:
-        filter_query["role"] = role
+    filter_query = user_filter(q, role)
         
-    cursor = db.members.find(filter_query).sort("_id", -1).skip(skip).limit(limit)
-    users = await cursor.to_list(length=limit)
+    users = await fetch_page(db.members, filter_query, "_id", limit, skip, cursor, response)
     return users
 
 @router.post("/", response_model=UserResponse, status_code=201)
@@ -53,7 +59,7 @@ async def create_user(user: UserRegister, current_user: dict = Depends(get_curre
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     user_dict = user.model_dump()
     user_dict["password"] = hashed_password
     user_dict["role"] = "member" # Default, or could be passed? adhering to Register model logic for now but allowing updates later
@@ -65,8 +71,10 @@ async def create_user(user: UserRegister, current_user: dict = Depends(get_curre
         "status": "active"
     }
     user_dict["walletBalance"] = 0
+    user_dict["activeLoans"] = 0
     
     new_user = await db.members.insert_one(user_dict)
+    await event_bus.publish(MEMBER_UPDATED, memberId=new_user.inserted_id)
     created_user = await db.members.find_one({"_id": new_user.inserted_id})
     return created_user
 
@@ -96,6 +104,7 @@ async def update_user(
             {"_id": user_id},
             {"$set": update_data}
         )
+        await event_bus.publish(MEMBER_UPDATED, memberId=user_id)
         
     updated_user = await db.members.find_one({"_id": user_id})
     return updated_user
@@ -109,5 +118,6 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
     result = await db.members.delete_one({"_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await event_bus.publish(MEMBER_UPDATED, memberId=user_id)
     
     return None
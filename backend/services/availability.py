@@ -0,0 +1,112 @@
+"""
+Per-branch availability summary embedded in book documents
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, Tuple
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+# Branch ids become part of a field path, so only plain ids are accepted
+_BRANCH_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def available_field(branch_id: str) -> str:
+    """Field holding the number of available copies at a branch"""
+    if not _BRANCH_ID_RE.match(branch_id):
+        raise HTTPException(status_code=400, detail="Invalid branch id")
+    return f"availability.{branch_id}.available"
+
+def available_at(branch_id: str) -> dict:
+    """Filter for books with at least one copy on the shelf at a branch"""
+    return {available_field(branch_id): {"$gt": 0}}
+
+async def adjust_available(db, copies: Iterable[Tuple[str, str]], delta: int):
+    """$inc the available count for (bookId, branchId) pairs, one bulk_write.
+
+    The summary is derived data: a failed update is logged rather than
+    failing the circulation request, and rebuild_availability repairs it.
+    Books with no summary for the branch are left alone rather than given
+    a bare, possibly negative, available count.
+    """
+    counts = Counter(copies)
+    if not counts:
+        return
+    ops = [
+        UpdateOne(
+            {"_id": book_id, f"availability.{branch_id}.total": {"$exists": True}},
+            {"$inc": {f"availability.{branch_id}.available": delta * n}}
+        )
+        for (book_id, branch_id), n in counts.items()
+    ]
+    try:
+        await db.books.bulk_write(ops, ordered=False)
+    except Exception as e:
+        print(f"✗ Availability update failed: {e}")
+
+def _summary_pipeline(match: dict) -> list:
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"bookId": "$bookId", "branchId": "$branchId"},
+            "total": {"$sum": 1},
+            "available": {"$sum": {"$cond": [{"$eq": ["$status", "available"]}, 1, 0]}}
+        }},
+        {"$sort": {"_id.bookId": 1}}
+    ]
+
+async def add_copy(db, copy: dict):
+    """Count a new (already inserted) copy in its book's summary"""
+    inc = {f"availability.{copy['branchId']}.total": 1}
+    if copy["status"] == "available":
+        inc[f"availability.{copy['branchId']}.available"] = 1
+    result = await db.books.update_one(
+        {"_id": copy["bookId"], "availability": {"$exists": True}}, {"$inc": inc}
+    )
+    if result.matched_count == 0:
+        # Book predates the summary: count all of its copies, not just this one
+        summary = {
+            row["_id"]["branchId"]: {"available": row["available"], "total": row["total"]}
+            async for row in db.copies.aggregate(_summary_pipeline({"bookId": copy["bookId"]}))
+        }
+        await db.books.update_one({"_id": copy["bookId"]}, {"$set": {"availability": summary}})
+
+async def rebuild_availability(db, batch_size: int = 1000) -> dict:
+    """Maintenance job: recompute every book's summary from `copies`.
+
+    Required once on databases created before the summary existed, since
+    writes only maintain it. Loans made while it runs may be overwritten
+    by the $set for their book; rerun it during a quiet period to settle
+    the counts.
+    """
+    pipeline = _summary_pipeline({})
+
+    books = 0
+    ops = []
+    current_id, summary = None, {}
+
+    async def flush():
+        nonlocal ops
+        if ops:
+            await db.books.bulk_write(ops, ordered=False)
+            ops = []
+
+    async for row in db.copies.aggregate(pipeline, allowDiskUse=True):
+        book_id = row["_id"]["bookId"]
+        if book_id != current_id and current_id is not None:
+            ops.append(UpdateOne({"_id": current_id}, {"$set": {"availability": summary}}))
+            books += 1
+            summary = {}
+            if len(ops) >= batch_size:
+                await flush()
+        current_id = book_id
+        summary[row["_id"]["branchId"]] = {"available": row["available"], "total": row["total"]}
+
+    if current_id is not None:
+        ops.append(UpdateOne({"_id": current_id}, {"$set": {"availability": summary}}))
+        books += 1
+    await flush()
+
+    # Books without any copies
+    empty = await db.books.update_many({"availability": {"$exists": False}}, {"$set": {"availability": {}}})
+    return {"books": books, "withoutCopies": empty.modified_count}
@@ -0,0 +1,55 @@
+"""
+Per-branch performance metrics - one $group per collection, joined in memory
+"""
+
+import asyncio
+from typing import Dict, List
+
+ACTIVE_STATUSES = ["active", "overdue"]
+
+# Collection -> $group stage keyed by branch; the number of round trips
+# stays the same however many branches there are
+BRANCH_GROUPS = {
+    "copies": {
+        "_id": "$branchId",
+        "totalCopies": {"$sum": 1},
+        "availableCopies": {"$sum": {"$cond": [{"$eq": ["$status", "available"]}, 1, 0]}}
+    },
+    "members": {
+        "_id": "$branchId",
+        "totalMembers": {"$sum": 1}
+    },
+    "loans": {
+        "_id": "$branchId",
+        "totalLoans": {"$sum": 1},
+        "activeLoans": {"$sum": {"$cond": [{"$in": ["$status", ACTIVE_STATUSES]}, 1, 0]}}
+    },
+}
+METRICS = ["totalCopies", "availableCopies", "totalMembers", "totalLoans", "activeLoans"]
+
+async def _group(db, collection: str) -> Dict[str, dict]:
+    rows = await db[collection].aggregate([{"$group": BRANCH_GROUPS[collection]}]).to_list(length=None)
+    return {row.pop("_id"): row for row in rows}
+
+async def branch_performance(db) -> List[dict]:
+    """Metrics for every branch, in branch id order"""
+    branches, *groups = await asyncio.gather(
+        db.branches.find({}, {"name": 1, "city": 1}).sort("_id", 1).to_list(length=None),
+        *(_group(db, collection) for collection in BRANCH_GROUPS)
+    )
+
+    performance = []
+    for branch in branches:
+        branch_id = branch["_id"]
+        metrics = dict.fromkeys(METRICS, 0)
+        for group in groups:
+            metrics.update(group.get(branch_id, {}))
+        total_copies = metrics["totalCopies"]
+        performance.append({
+            "branchId": branch_id,
+            "branchName": branch.get("name"),
+            "city": branch.get("city"),
+            **metrics,
+            "utilizationRate": round((total_copies - metrics["availableCopies"]) / total_copies * 100, 2) if total_copies > 0 else 0
+        })
+    return performance
@@ -0,0 +1,83 @@
+"""
+Catalog cache - book documents, per-book copy lists and digital licenses
+"""
+
+from config import settings
+from utils.cache import BSONCache, MISSING
+
+class CatalogCache:
+    """Read-through caches for the catalog endpoints.
+
+    Books and licenses change only through admin writes, so they use a
+    long TTL. Copy lists change on every borrow/return; events from
+    any worker invalidate them, and a short TTL bounds staleness when
+    an event is missed.
+    """
+
+    def __init__(self):
+        budget = settings.CATALOG_CACHE_MAX_MB * 1024 * 1024
+        self.books = BSONCache(
+            maxsize=settings.CATALOG_CACHE_MAX_BOOKS,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+            max_bytes=budget * 6 // 10,
+            name="books"
+        )
+        self.copies = BSONCache(
+            maxsize=settings.CATALOG_CACHE_MAX_BOOKS,
+            ttl=settings.COPIES_CACHE_TTL_SECONDS,
+            max_bytes=budget * 3 // 10,
+            name="copies"
+        )
+        self.licenses = BSONCache(
+            maxsize=settings.CATALOG_CACHE_MAX_BOOKS,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+            max_bytes=budget // 10,
+            name="digitalLicenses"
+        )
+
+    async def get_book(self, db, book_id: str):
+        book = self.books.get(book_id, MISSING)
+        if book is MISSING:
+            book = await db.books.find_one({"_id": book_id})
+            if book is not None:
+                self.books.set(book_id, book)
+        return book
+
+    async def get_copies(self, db, book_id: str) -> list:
+        copies = self.copies.get(book_id, MISSING)
+        if copies is MISSING:
+            copies = await db.copies.find({"bookId": book_id}).to_list(length=None)
+            self.copies.set(book_id, copies)
+        return copies
+
+    async def get_license(self, db, book_id: str):
+        # Books without a license are cached as None too
+        license = self.licenses.get(book_id, MISSING)
+        if license is MISSING:
+            license = await db.digital_licenses.find_one({"bookId": book_id})
+            self.licenses.set(book_id, license)
+        return license
+
+    def invalidate_book(self, book_id: str):
+        self.books.invalidate(book_id)
+        self.copies.invalidate(book_id)
+        self.licenses.invalidate(book_id)
+
+    def invalidate_copies(self, book_id: str):
+        # The book embeds per-branch availability, which changes with its copies
+        self.copies.invalidate(book_id)
+        self.books.invalidate(book_id)
+
+    def clear(self):
+        self.books.clear()
+        self.copies.clear()
+        self.licenses.clear()
+
+    def stats(self) -> dict:
+        return {
+            "books": self.books.stats(),
+            "copies": self.copies.stats(),
+            "digitalLicenses": self.licenses.stats()
+        }
+
+catalog_cache = CatalogCache()
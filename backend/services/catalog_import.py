@@ -0,0 +1,229 @@
+"""
+Bulk catalog import - streaming JSONL/CSV parse, chunked validation, batched upserts
+"""
+
+import csv
+import json
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, TextIO, Tuple
+from pydantic import TypeAdapter, ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from models.book import BookImportRow
+from utils.sequence import generate_ids
+from services.search import search_fields
+from services.events import event_bus, BOOK_UPDATED
+
+FORMATS = ("jsonl", "csv")
+# CSV cells holding lists, written as "a; b" (the export format)
+LIST_COLUMNS = ("authors", "subjects")
+
+_chunk_adapter = TypeAdapter(List[BookImportRow])
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw row) one at a time; rows that do not parse
+    are yielded as an error string so the import reports them and goes on"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells fall back to the model defaults
+            parsed = {key: value for key, value in row.items() if key and value not in (None, "")}
+            for column in LIST_COLUMNS:
+                if column in parsed:
+                    parsed[column] = [item.strip() for item in parsed[column].split(";") if item.strip()]
+            yield reader.line_num, parsed
+        return
+
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, f"Invalid JSON: {e.msg}"
+            continue
+        yield line_num, row if isinstance(row, dict) else "Expected a JSON object"
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _validate(raw_rows: List[object]) -> Tuple[Dict[int, BookImportRow], Dict[int, List[str]]]:
+    """Validate a chunk in one call; only a chunk with errors is revalidated
+    row by row to find which rows are bad"""
+    candidates = {i: row for i, row in enumerate(raw_rows) if isinstance(row, dict)}
+    errors = {i: [row] for i, row in enumerate(raw_rows) if not isinstance(row, dict)}
+    try:
+        return dict(zip(candidates, _chunk_adapter.validate_python(list(candidates.values())))), errors
+    except ValidationError:
+        pass
+
+    valid = {}
+    for i, row in candidates.items():
+        try:
+            valid[i] = BookImportRow.model_validate(row)
+        except ValidationError as e:
+            errors[i] = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+    return valid, errors
+
+def _new_book(book_id: str, row: BookImportRow) -> Tuple[dict, List[dict]]:
+    """Book document and its shelved copies; copies start available"""
+    book = row.model_dump(exclude={"copies"})
+    book["_id"] = book_id
+    book["search"] = search_fields(book)
+    book["availability"] = {
+        branch_id: {"available": count, "total": count}
+        for branch_id, count in row.copies.items() if count
+    }
+    copies = []
+    for branch_id, count in row.copies.items():
+        for _ in range(count):
+            barcode = f"{book_id}-C{str(len(copies) + 1).zfill(3)}"
+            copies.append({
+                "_id": barcode,
+                "bookId": book_id,
+                "branchId": branch_id,
+                "barcode": barcode,
+                "status": "available",
+                "condition": "Good"
+            })
+    return book, copies
+
+class CatalogImport:
+    """One import run; `run` yields a progress event per chunk.
+
+    ISBNs are deduplicated within the file in memory and against the
+    catalog with one `$in` lookup per chunk (books_isbn_unique). New books
+    get IDs from one sequence block per chunk and are written with
+    unordered upserts keyed on ISBN, so a rerun after a failure skips what
+    already landed, and a book inserted concurrently is not duplicated.
+    Copies are only created for books this run inserted.
+    """
+
+    def __init__(self, db, update_existing: bool = False, chunk_size: int = 1000):
+        self.db = db
+        self.update_existing = update_existing
+        self.chunk_size = chunk_size
+        self.seen_isbns = set()
+        self.branches = set()
+        self.totals = {"rows": 0, "inserted": 0, "updated": 0, "duplicates": 0, "copies": 0, "errors": 0}
+
+    async def run(self, rows: Iterable[Tuple[int, object]]) -> AsyncIterator[dict]:
+        self.branches = {branch["_id"] for branch in await self.db.branches.find({}, {"_id": 1}).to_list(length=None)}
+        start_time = time.time()
+        for chunk in _chunks(rows, self.chunk_size):
+            errors = await self._import_chunk(chunk)
+            elapsed = time.time() - start_time
+            yield {
+                "type": "progress",
+                **self.totals,
+                "rowsPerSec": round(self.totals["rows"] / elapsed, 1) if elapsed else None,
+                "errorRows": errors
+            }
+        yield {"type": "summary", **self.totals, "seconds": round(time.time() - start_time, 2)}
+
+    async def _import_chunk(self, chunk: List[Tuple[int, object]]) -> List[dict]:
+        self.totals["rows"] += len(chunk)
+        valid, errors = _validate([raw for _, raw in chunk])
+
+        # Dedupe within the file, then check unknown branches
+        rows: Dict[str, Tuple[int, BookImportRow]] = {}
+        for i, row in valid.items():
+            unknown = [branch_id for branch_id in row.copies if branch_id not in self.branches]
+            if unknown:
+                errors[i] = [f"copies: unknown branch {', '.join(unknown)}"]
+            elif row.isbn in self.seen_isbns:
+                self.totals["duplicates"] += 1
+            else:
+                self.seen_isbns.add(row.isbn)
+                rows[row.isbn] = (i, row)
+
+        existing = {}
+        if rows:
+            async for book in self.db.books.find({"isbn": {"$in": list(rows)}}, {"isbn": 1}):
+                existing[book["isbn"]] = book["_id"]
+
+        ops = []
+        books = []
+        copies: Dict[str, List[dict]] = {}
+        new_rows = [(isbn, row) for isbn, (_, row) in rows.items() if isbn not in existing]
+        book_ids = await generate_ids(self.db, "books", len(new_rows)) if new_rows else []
+        for book_id, (isbn, row) in zip(book_ids, new_rows):
+            book, book_copies = _new_book(book_id, row)
+            ops.append(UpdateOne({"isbn": isbn}, {"$setOnInsert": book}, upsert=True))
+            books.append(book)
+            copies[book_id] = book_copies
+
+        for isbn, book_id in existing.items():
+            if not self.update_existing:
+                self.totals["duplicates"] += 1
+                continue
+            book = {**rows[isbn][1].model_dump(exclude={"copies"}), "_id": book_id}
+            book["search"] = search_fields(book)
+            ops.append(UpdateOne({"_id": book_id}, {"$set": {k: v for k, v in book.items() if k != "_id"}}))
+            books.append(book)
+
+        inserted_ids, written = set(), []
+        if ops:
+            try:
+                details = (await self.db.books.bulk_write(ops, ordered=False)).bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+            failed = set()
+            for err in details.get("writeErrors", []):
+                failed.add(err["index"])
+                errors[rows[books[err["index"]]["isbn"]][0]] = [err["errmsg"]]
+            inserted_ids = {upsert["_id"] for upsert in details.get("upserted", [])}
+
+            for index, book in enumerate(books):
+                if index in failed:
+                    continue
+                if book["_id"] in inserted_ids:
+                    self.totals["inserted"] += 1
+                elif book["_id"] in copies:
+                    # The upsert matched: another writer inserted this ISBN first
+                    self.totals["duplicates"] += 1
+                    continue
+                else:
+                    self.totals["updated"] += 1
+                written.append(book["_id"])
+
+        await self._write_copies([copy for book_id in inserted_ids for copy in copies[book_id]])
+        if written:
+            # Every API worker reindexes the chunk, wherever the import runs
+            await event_bus.publish(BOOK_UPDATED, bookIds=written)
+
+        self.totals["errors"] += len(errors)
+        return [
+            {"line": chunk[i][0], "isbn": valid[i].isbn if i in valid else None, "errors": messages}
+            for i, messages in sorted(errors.items())
+        ]
+
+    async def _write_copies(self, copies: List[dict]):
+        if not copies:
+            return
+        # Later copies added through the API continue each book's barcode
+        # sequence past every barcode handed out here
+        counts: Dict[str, int] = {}
+        for copy in copies:
+            counts[copy["bookId"]] = counts.get(copy["bookId"], 0) + 1
+        await self.db.counters.bulk_write([
+            UpdateOne({"_id": f"copies:{book_id}"}, {"$max": {"value": count}}, upsert=True)
+            for book_id, count in counts.items()
+        ], ordered=False)
+
+        written = len(copies)
+        try:
+            await self.db.copies.bulk_write([InsertOne(copy) for copy in copies], ordered=False)
+        except BulkWriteError as e:
+            # e.g. barcodes left behind by a deleted book; rebuild-availability
+            # brings the summaries back in line with the copies that exist
+            written = e.details["nInserted"]
+            print(f"✗ {len(e.details['writeErrors'])} imported copies failed: {e.details['writeErrors'][0]['errmsg']}")
+        self.totals["copies"] += written
@@ -0,0 +1,753 @@
+"""
+Circulation engine - borrow, return and renew with atomic state changes
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from collections import Counter
+from typing import List, Optional
+from fastapi import HTTPException
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from utils.sequence import generate_id, generate_ids
+from services.txlog import transaction_log, DUPLICATE_KEY
+from services.catalog_cache import catalog_cache
+from services.availability import adjust_available
+from services.leaderboard import record_borrows
+from services.events import event_bus, COPY_STATUS_CHANGED, LOAN_CREATED
+
+FINE_PER_DAY = 5000  # VND
+MAX_RENEWALS = 2
+RENEW_DAYS = 14
+RENEW_GRACE_DAYS = 3
+# Follow-up writes of a return, listed in the loan's releasePending until done
+RETURN_STEPS = ["copy", "slot", "transactions"]
+# Returns younger than this may still be finishing in their own request
+FINISH_RETURNS_AFTER = timedelta(minutes=5)
+
+def loan_filter(loan: dict) -> dict:
+    """Filter on a loan's _id plus shard key so writes hit a single shard"""
+    return {
+        "_id": loan["_id"],
+        "branchId": loan["branchId"],
+        "borrowedAt": loan["borrowedAt"]
+    }
+
+def check_loan_access(loan: dict, actor: dict):
+    """Members may only act on their own loans; staff and admins on any"""
+    if loan["memberId"] != actor["_id"] and actor["role"].lower() not in ["staff", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+def _check_subscription(member: dict, now: datetime):
+    if member["subscription"]["endDate"] and member["subscription"]["endDate"] < now:
+        raise HTTPException(
+            status_code=403,
+            detail="Your subscription has expired. Please renew."
+        )
+
+def _max_loans_error(max_loans: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"You have reached the maximum number of loans ({max_loans})"
+    )
+
+async def _count_active_loans(db, member: dict) -> int:
+    return await db.loans.count_documents({
+        "memberId": member["_id"],
+        "status": {"$in": ["active", "overdue"]}
+    })
+
+async def _current_active_loans(db, member: dict) -> int:
+    """Read the member's activeLoans counter, initialising it if missing"""
+    doc = await db.members.find_one({"_id": member["_id"]}, {"activeLoans": 1})
+    if doc is not None and "activeLoans" in doc:
+        return doc["activeLoans"]
+
+    # Members created before the counter existed: count once and store it
+    count = await _count_active_loans(db, member)
+    await db.members.update_one(
+        {"_id": member["_id"], "activeLoans": {"$exists": False}},
+        {"$set": {"activeLoans": count}}
+    )
+    return count
+
+async def _reserve_loan_slots(db, member: dict, count: int) -> bool:
+    """Atomically take `count` loan slots if the member stays within maxLoans"""
+    max_loans = member["subscription"]["maxLoans"]
+    result = await db.members.update_one(
+        {"_id": member["_id"], "activeLoans": {"$lte": max_loans - count}},
+        {"$inc": {"activeLoans": count}}
+    )
+    if result.modified_count:
+        return True
+
+    # Slow path: the counter may simply not exist yet for this member
+    if await _current_active_loans(db, member) > max_loans - count:
+        return False
+    result = await db.members.update_one(
+        {"_id": member["_id"], "activeLoans": {"$lte": max_loans - count}},
+        {"$inc": {"activeLoans": count}}
+    )
+    return bool(result.modified_count)
+
+async def _release_loan_slots(db, slots: Counter):
+    """Give back loan slots per member id (returns, failed borrows)"""
+    ops = [
+        UpdateOne(
+            {"_id": member_id, "activeLoans": {"$gte": count}},
+            {"$inc": {"activeLoans": -count}}
+        )
+        for member_id, count in slots.items() if count > 0
+    ]
+    if ops:
+        await db.members.bulk_write(ops, ordered=False)
+
+def _claim_filter(copy_id: str, member: dict) -> dict:
+    return {"_id": copy_id, "status": "available", "branchId": member["branchId"]}
+
+def _book_claim_filter(book_id: str, member: dict) -> dict:
+    """Any available copy of a book at the member's branch; matches the
+    copies (bookId, branchId, status) index"""
+    return {"bookId": book_id, "branchId": member["branchId"], "status": "available"}
+
+async def _copy_unavailable(db, copy_id: str, member: dict) -> HTTPException:
+    """Explain why a copy could not be claimed (slow path only)"""
+    copy = await db.copies.find_one({"_id": copy_id})
+    if not copy:
+        return HTTPException(status_code=404, detail="Copy not found")
+    if copy["branchId"] != member["branchId"]:
+        return HTTPException(
+            status_code=400,
+            detail=f"This copy is only available at {copy['branchId']} branch"
+        )
+    return HTTPException(status_code=400, detail="Copy is not available")
+
+async def _book_unavailable(db, book_id: str, member: dict) -> HTTPException:
+    if not await catalog_cache.get_book(db, book_id):
+        return HTTPException(status_code=404, detail="Book not found")
+    return HTTPException(
+        status_code=400,
+        detail=f"No copy of this book is available at {member['branchId']} branch"
+    )
+
+def _borrow_docs(member: dict, copy: dict, loan_id: str, tx_id: str, now: datetime):
+    """Build the loan and borrow transaction for a claimed copy"""
+    loan_doc = {
+        "_id": loan_id,
+        "branchId": member["branchId"],
+        "memberId": member["_id"],
+        "copyId": copy["_id"],
+        "bookId": copy["bookId"],
+        "borrowedAt": now,
+        "dueAt": now + timedelta(days=member["subscription"]["loanDuration"]),
+        "returnedAt": None,
+        "status": "active",
+        "renewCount": 0
+    }
+    transaction_doc = {
+        "_id": tx_id,
+        "branchId": member["branchId"],
+        "type": "borrow",
+        "memberId": member["_id"],
+        "copyId": copy["_id"],
+        "loanId": loan_id,
+        "createdAt": now
+    }
+    return loan_doc, transaction_doc
+
+def _check_returnable(loan: dict):
+    if loan["status"] == "returned":
+        raise HTTPException(status_code=400, detail="Book already returned")
+
+def _return_terms(loan: dict, now: datetime):
+    """Compute (overdue days, fine amount) for returning a loan now"""
+    overdue_days = 0
+    fine_amount = 0
+    if now > loan["dueAt"]:
+        overdue_days = (now - loan["dueAt"]).days
+        if overdue_days > 0:
+            fine_amount = overdue_days * FINE_PER_DAY
+    return overdue_days, fine_amount
+
+def _return_tx_count(fine_amount: int) -> int:
+    return 2 if fine_amount > 0 else 1
+
+def _return_update(now: datetime, overdue_days: int, fine_amount: int, tx_ids: List[str]) -> dict:
+    return {"$set": {
+        "returnedAt": now,
+        "status": "returned",
+        "overdueDays": overdue_days,
+        "fineAmount": fine_amount,
+        # Kept so a retried follow-up writes the same transactions
+        "returnTxIds": tx_ids,
+        "releasePending": list(RETURN_STEPS)
+    }}
+
+def _return_transactions(loan: dict, tx_ids: List[str], now: datetime, overdue_days: int, fine_amount: int) -> List[dict]:
+    """Build the return transaction, plus a fine transaction when overdue"""
+    docs = [{
+        "_id": tx_ids[0],
+        "branchId": loan["branchId"],
+        "type": "return",
+        "memberId": loan["memberId"],
+        "copyId": loan["copyId"],
+        "loanId": loan["_id"],
+        "createdAt": now
+    }]
+    if fine_amount > 0:
+        docs.append({
+            "_id": tx_ids[1],
+            "branchId": loan["branchId"],
+            "type": "fine",
+            "memberId": loan["memberId"],
+            "loanId": loan["_id"],
+            "amount": fine_amount,
+            "description": f"Overdue fine for {overdue_days} days",
+            "status": "pending",  # User needs to pay this
+            "createdAt": now
+        })
+    return docs
+
+def _check_renewable(loan: dict, now: datetime):
+    if loan["status"] == "returned":
+        raise HTTPException(status_code=400, detail="Cannot renew returned book")
+
+    if loan.get("renewCount", 0) >= MAX_RENEWALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum renewal limit reached ({MAX_RENEWALS} times)"
+        )
+
+    # Check if overdue by more than the grace period
+    if now > loan["dueAt"]:
+        days_overdue = (now - loan["dueAt"]).days
+        if days_overdue > RENEW_GRACE_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot renew: Book is overdue by {days_overdue} days. Please return it."
+            )
+
+def _renew_filter(loan: dict) -> dict:
+    """Matching on renewCount rejects a concurrent renew of the same loan"""
+    return {
+        **loan_filter(loan),
+        "status": {"$ne": "returned"},
+        "renewCount": loan["renewCount"] if "renewCount" in loan else {"$exists": False}
+    }
+
+def _renew_update(loan: dict) -> dict:
+    return {
+        "$set": {
+            "dueAt": loan["dueAt"] + timedelta(days=RENEW_DAYS),
+            "status": "active"  # Reset to active if was overdue
+        },
+        "$inc": {"renewCount": 1}
+    }
+
+def _renew_transaction(loan: dict, tx_id: str, now: datetime) -> dict:
+    return {
+        "_id": tx_id,
+        "branchId": loan["branchId"],
+        "type": "renew",
+        "memberId": loan["memberId"],
+        "copyId": loan["copyId"],
+        "loanId": loan["_id"],
+        "createdAt": now,
+        "description": f"Renewal #{loan.get('renewCount', 0) + 1}"
+    }
+
+def _loan_copy(loan: dict) -> dict:
+    """The copy fields of a loan (copies stay at the loan's branch)"""
+    return {"_id": loan["copyId"], "bookId": loan["bookId"], "branchId": loan["branchId"]}
+
+async def _release_copies(db, copies: List[dict]):
+    """Put copies back on the shelf and count them in their books' availability"""
+    if copies:
+        await asyncio.gather(
+            db.copies.update_many(
+                {"_id": {"$in": [copy["_id"] for copy in copies]}},
+                {"$set": {"status": "available"}}
+            ),
+            adjust_available(db, [(copy["bookId"], copy["branchId"]) for copy in copies], 1)
+        )
+
+async def _record_once(db, docs: List[dict]):
+    """Record transactions that an earlier attempt may have partly written"""
+    try:
+        await transaction_log.record(db, docs)
+    except BulkWriteError as e:
+        if any(err["code"] != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise
+
+async def _return_step(db, query: dict, step: str, action):
+    """Run one follow-up of the returned loans matching `query` at most
+    once: claim it by pulling it from releasePending, put it back if
+    `action()` fails"""
+    claimed = await db.loans.update_many(
+        {**query, "releasePending": step}, {"$pull": {"releasePending": step}}
+    )
+    if not claimed.modified_count:
+        return
+    try:
+        await action()
+    except Exception:
+        await db.loans.update_many(query, {"$addToSet": {"releasePending": step}})
+        raise
+
+async def _finish_returns(db, query: dict, loans: List[dict]):
+    """Free the copies and loan slots of returned loans and record their
+    return (and fine) transactions.
+
+    The loans are already closed, so nothing is undone on failure: a failed
+    step stays in releasePending for a retried return or
+    `jobs.py finish-returns` to run again.
+    """
+    transaction_docs = []
+    for loan in loans:
+        transaction_docs.extend(_return_transactions(
+            loan, loan["returnTxIds"], loan["returnedAt"], loan["overdueDays"], loan["fineAmount"]
+        ))
+
+    results = await asyncio.gather(
+        _return_step(db, query, "copy", lambda: _release_copies(db, [_loan_copy(loan) for loan in loans])),
+        _return_step(db, query, "slot", lambda: _release_loan_slots(db, Counter(loan["memberId"] for loan in loans))),
+        _return_step(db, query, "transactions", lambda: _record_once(db, transaction_docs)),
+        return_exceptions=True
+    )
+    await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[loan["bookId"] for loan in loans])
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        raise errors[0]
+    await db.loans.update_many(
+        {**query, "releasePending": {"$size": 0}}, {"$unset": {"releasePending": ""}}
+    )
+
+async def borrow(db, member: dict, copy_id: str) -> dict:
+    """Claim an available copy for a member and record the loan"""
+    return await _borrow(
+        db, member, _claim_filter(copy_id, member),
+        lambda: _copy_unavailable(db, copy_id, member)
+    )
+
+async def borrow_book(db, member: dict, book_id: str) -> dict:
+    """Claim whichever copy of a book is on the shelf at the member's
+    branch, so concurrent borrowers each get a different copy"""
+    return await _borrow(
+        db, member, _book_claim_filter(book_id, member),
+        lambda: _book_unavailable(db, book_id, member)
+    )
+
+async def _borrow(db, member: dict, claim: dict, unavailable) -> dict:
+    """Borrow the copy matched by `claim`; `unavailable()` explains a miss"""
+    now = datetime.now()
+
+    _check_subscription(member, now)
+
+    # Allocated up front: once the slot and copy are taken, every failure
+    # has to be rolled back
+    loan_id = await generate_id(db, "loans")
+    tx_id = await generate_id(db, "transactions")
+
+    # Take a loan slot with one conditional update instead of counting loans
+    if not await _reserve_loan_slots(db, member, 1):
+        raise _max_loans_error(member["subscription"]["maxLoans"])
+
+    # Claim the copy: only one concurrent borrower can flip it from available
+    copy = await db.copies.find_one_and_update(
+        claim,
+        {"$set": {"status": "borrowed"}},
+        return_document=ReturnDocument.AFTER
+    )
+    if copy is None:
+        await _release_loan_slots(db, Counter({member["_id"]: 1}))
+        raise await unavailable()
+    await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[copy["bookId"]])
+
+    loan_doc, transaction_doc = _borrow_docs(member, copy, loan_id, tx_id, now)
+
+    # Loan, transaction, availability and borrow counters are independent,
+    # so write them in parallel
+    results = await asyncio.gather(
+        db.loans.insert_one(loan_doc),
+        transaction_log.record(db, [transaction_doc]),
+        adjust_available(db, [(copy["bookId"], copy["branchId"])], -1),
+        record_borrows(db, [loan_doc]),
+        return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        # Release the copy and slot, and drop the half-written loan
+        rollback = [
+            _release_copies(db, [copy]),
+            _release_loan_slots(db, Counter({member["_id"]: 1})),
+            db.loans.delete_one(loan_filter(loan_doc)),
+            transaction_log.discard(db, [tx_id])
+        ]
+        if results[3] is True:
+            rollback.append(record_borrows(db, [loan_doc], sign=-1))
+        await asyncio.gather(*rollback, return_exceptions=True)
+        await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[copy["bookId"]])
+        raise errors[0]
+
+    await event_bus.publish(LOAN_CREATED, bookIds=[copy["bookId"]], memberId=member["_id"])
+    return loan_doc
+
+async def return_loan(db, loan_id: str, actor: dict) -> dict:
+    """Close a loan, free its copy and record return (and fine) transactions.
+
+    Returning a loan whose earlier return stopped part way finishes it.
+    """
+    loan = await db.loans.find_one({"_id": loan_id})
+    if not loan:
+        raise HTTPException(status_code=404, detail="Loan not found")
+
+    check_loan_access(loan, actor)
+    if loan["status"] == "returned" and loan.get("releasePending"):
+        await _finish_returns(db, loan_filter(loan), [loan])
+        return loan
+    _check_returnable(loan)
+
+    now = datetime.now()
+    overdue_days, fine_amount = _return_terms(loan, now)
+    tx_ids = await generate_ids(db, "transactions", _return_tx_count(fine_amount))
+
+    # Conditional update so a concurrent return cannot close the loan twice
+    updated_loan = await db.loans.find_one_and_update(
+        {**loan_filter(loan), "status": {"$ne": "returned"}},
+        _return_update(now, overdue_days, fine_amount, tx_ids),
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_loan is None:
+        raise HTTPException(status_code=400, detail="Book already returned")
+
+    await _finish_returns(db, loan_filter(updated_loan), [updated_loan])
+    return updated_loan
+
+async def renew(db, loan_id: str, actor: dict) -> dict:
+    """Extend a loan's due date and record a renew transaction"""
+    loan = await db.loans.find_one({"_id": loan_id})
+    if not loan:
+        raise HTTPException(status_code=404, detail="Loan not found")
+
+    check_loan_access(loan, actor)
+
+    now = datetime.now()
+    _check_renewable(loan, now)
+
+    updated_loan = await db.loans.find_one_and_update(
+        _renew_filter(loan),
+        _renew_update(loan),
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_loan is None:
+        raise HTTPException(status_code=409, detail="Loan changed while renewing, please retry")
+
+    tx_id = await generate_id(db, "transactions")
+    await transaction_log.record(db, [_renew_transaction(loan, tx_id, now)])
+
+    return updated_loan
+
+class _BatchResults:
+    """Per-item outcome of a batch, in request order"""
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.items: List[Optional[dict]] = [None] * len(operations)
+
+    def ok(self, index: int, loan: dict):
+        self.items[index] = {
+            "index": index,
+            "op": self.operations[index].op,
+            "ok": True,
+            "status": 200,
+            "loan": loan
+        }
+
+    def fail(self, index: int, exc: HTTPException):
+        self.items[index] = {
+            "index": index,
+            "op": self.operations[index].op,
+            "ok": False,
+            "status": exc.status_code,
+            "detail": exc.detail
+        }
+
+async def _batch_close(db, actor: dict, branch_id: Optional[str], items, results: _BatchResults, now: datetime):
+    """Apply the return/renew items of a batch with one bulk write per collection"""
+    loan_ids = list({op.loanId for _, op in items})
+    loans = {
+        loan["_id"]: loan
+        for loan in await db.loans.find({"_id": {"$in": loan_ids}}).to_list(length=None)
+    }
+
+    # Stamped on every loan this batch writes, so a re-read can tell its
+    # writes from a concurrent request's that left the same field values
+    batch_id = str(ObjectId())
+    loan_ops = []
+    checked = []  # (index, op, loan, return terms)
+    seen = set()
+    for index, op in items:
+        try:
+            if op.loanId in seen:
+                raise HTTPException(status_code=400, detail="Duplicate loan in batch")
+            seen.add(op.loanId)
+
+            loan = loans.get(op.loanId)
+            if not loan:
+                raise HTTPException(status_code=404, detail="Loan not found")
+            if branch_id and loan["branchId"] != branch_id:
+                raise HTTPException(status_code=400, detail=f"Loan belongs to {loan['branchId']} branch")
+            check_loan_access(loan, actor)
+
+            if op.op == "return":
+                _check_returnable(loan)
+                checked.append((index, op, loan, _return_terms(loan, now)))
+            else:
+                _check_renewable(loan, now)
+                checked.append((index, op, loan, None))
+        except HTTPException as exc:
+            results.fail(index, exc)
+
+    if not checked:
+        return
+
+    # Returned loans store their transaction ids, so allocate them first
+    tx_count = sum(_return_tx_count(terms[1]) if terms else 1 for _, _, _, terms in checked)
+    tx_ids = iter(await generate_ids(db, "transactions", tx_count))
+    planned = []  # (index, op, loan, update, renew transaction id)
+    for index, op, loan, terms in checked:
+        if op.op == "return":
+            overdue_days, fine_amount = terms
+            ids = [next(tx_ids) for _ in range(_return_tx_count(fine_amount))]
+            update = _return_update(now, overdue_days, fine_amount, ids)
+            update["$set"]["batchId"] = batch_id
+            loan_ops.append(UpdateOne({**loan_filter(loan), "status": {"$ne": "returned"}}, update))
+            planned.append((index, op, loan, update, None))
+        else:
+            update = _renew_update(loan)
+            update["$set"]["batchId"] = batch_id
+            loan_ops.append(UpdateOne(_renew_filter(loan), update))
+            planned.append((index, op, loan, update, next(tx_ids)))
+
+    outcome = await db.loans.bulk_write(loan_ops, ordered=False)
+    applied = planned
+    if outcome.matched_count != len(loan_ops):
+        # Another request changed some loans in between: find which writes landed
+        current = {
+            loan["_id"]: loan
+            for loan in await db.loans.find(
+                {"_id": {"$in": [loan["_id"] for _, _, loan, _, _ in planned]}},
+                {"batchId": 1}
+            ).to_list(length=None)
+        }
+        applied = []
+        for entry in planned:
+            index, op, loan, _, _ = entry
+            if current.get(loan["_id"], {}).get("batchId") == batch_id:
+                applied.append(entry)
+            else:
+                results.fail(index, HTTPException(status_code=409, detail="Loan changed during batch, please retry"))
+
+    returned = []
+    renew_docs = []
+    for index, op, loan, update, tx_id in applied:
+        if op.op == "return":
+            loan = {**loan, **update["$set"]}
+            returned.append(loan)
+        else:
+            renew_docs.append(_renew_transaction(loan, tx_id, now))
+            loan = {**loan, **update["$set"], "renewCount": loan.get("renewCount", 0) + 1}
+        results.ok(index, loan)
+
+    # The loans are written, so a failed follow-up is logged rather than
+    # turned into per-item errors; releasePending records what is left
+    follow_ups = [transaction_log.record(db, renew_docs)]
+    if returned:
+        query = {"_id": {"$in": [loan["_id"] for loan in returned]}, "batchId": batch_id}
+        follow_ups.append(_finish_returns(db, query, returned))
+    for error in await asyncio.gather(*follow_ups, return_exceptions=True):
+        if isinstance(error, Exception):
+            print(f"✗ Batch {batch_id} follow-up failed: {error}")
+
+async def _batch_borrow(db, member: dict, items, results: _BatchResults, now: datetime):
+    """Claim copies for the borrow items of a batch and write loans in bulk"""
+    try:
+        _check_subscription(member, now)
+    except HTTPException as exc:
+        for index, _ in items:
+            results.fail(index, exc)
+        return
+
+    # Limits are checked once for the whole batch
+    max_loans = member["subscription"]["maxLoans"]
+    slots = max_loans - await _current_active_loans(db, member)
+
+    claimable = []
+    seen = set()
+    for index, op in items:
+        if op.copyId in seen:
+            results.fail(index, HTTPException(status_code=400, detail="Duplicate copy in batch"))
+        elif len(claimable) >= slots:
+            results.fail(index, _max_loans_error(max_loans))
+        else:
+            seen.add(op.copyId)
+            claimable.append((index, op))
+
+    if not claimable:
+        return
+
+    # Allocated before any slot or copy is taken; unused ids are skipped
+    loan_ids = await generate_ids(db, "loans", len(claimable))
+    tx_ids = await generate_ids(db, "transactions", len(claimable))
+
+    if not await _reserve_loan_slots(db, member, len(claimable)):
+        for index, _ in claimable:
+            results.fail(index, HTTPException(status_code=409, detail="Loan count changed during batch, please retry"))
+        return
+
+    # Each claim must know whether it won its copy, so these run as
+    # concurrent conditional updates rather than one bulk_write
+    copies = await asyncio.gather(*[
+        db.copies.find_one_and_update(
+            _claim_filter(op.copyId, member),
+            {"$set": {"status": "borrowed"}},
+            return_document=ReturnDocument.AFTER
+        )
+        for _, op in claimable
+    ])
+
+    claimed = []
+    for (index, op), copy in zip(claimable, copies):
+        if copy is None:
+            results.fail(index, await _copy_unavailable(db, op.copyId, member))
+        else:
+            claimed.append((index, copy))
+    if claimed:
+        await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[copy["bookId"] for _, copy in claimed])
+
+    unused_slots = len(claimable) - len(claimed)
+    if unused_slots:
+        await _release_loan_slots(db, Counter({member["_id"]: unused_slots}))
+
+    if not claimed:
+        return
+
+    loan_ids = loan_ids[:len(claimed)]
+    tx_ids = tx_ids[:len(claimed)]
+    loan_docs, transaction_docs = [], []
+    for (index, copy), loan_id, tx_id in zip(claimed, loan_ids, tx_ids):
+        loan_doc, transaction_doc = _borrow_docs(member, copy, loan_id, tx_id, now)
+        loan_docs.append(loan_doc)
+        transaction_docs.append(transaction_doc)
+
+    # Wait for every write, so the rollback knows which of them landed
+    written = await asyncio.gather(
+        db.loans.insert_many(loan_docs, ordered=False),
+        transaction_log.record(db, transaction_docs),
+        adjust_available(db, [(copy["bookId"], copy["branchId"]) for _, copy in claimed], -1),
+        record_borrows(db, loan_docs),
+        return_exceptions=True
+    )
+    if any(isinstance(result, Exception) for result in written):
+        rollback = [
+            _release_copies(db, [copy for _, copy in claimed]),
+            _release_loan_slots(db, Counter({member["_id"]: len(claimed)})),
+            db.loans.delete_many({"_id": {"$in": loan_ids}, "branchId": member["branchId"]}),
+            transaction_log.discard(db, tx_ids)
+        ]
+        if written[3] is True:
+            rollback.append(record_borrows(db, loan_docs, sign=-1))
+        await asyncio.gather(*rollback, return_exceptions=True)
+        await event_bus.publish(COPY_STATUS_CHANGED, bookIds=[copy["bookId"] for _, copy in claimed])
+        for index, _ in claimed:
+            results.fail(index, HTTPException(status_code=500, detail="Failed to record loan"))
+        return
+
+    await event_bus.publish(LOAN_CREATED, bookIds=[loan_doc["bookId"] for loan_doc in loan_docs], memberId=member["_id"])
+    for (index, _), loan_doc in zip(claimed, loan_docs):
+        results.ok(index, loan_doc)
+
+async def run_batch(db, actor: dict, member: Optional[dict], branch_id: Optional[str], operations) -> List[dict]:
+    """Apply a list of borrow/return/renew operations for one member or branch.
+
+    Returns and renewals run first so that copies returned in the same
+    batch free up loan slots for the borrows that follow.
+    """
+    results = _BatchResults(operations)
+    # BSON keeps milliseconds; loans returned in the response match what is stored
+    now = datetime.now()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+    closing = []
+    borrowing = []
+    for index, op in enumerate(operations):
+        if op.op == "borrow":
+            if member is None:
+                results.fail(index, HTTPException(status_code=400, detail="memberId is required to borrow"))
+            elif not op.copyId:
+                results.fail(index, HTTPException(status_code=400, detail="copyId is required to borrow"))
+            else:
+                borrowing.append((index, op))
+        elif not op.loanId:
+            results.fail(index, HTTPException(status_code=400, detail=f"loanId is required to {op.op}"))
+        else:
+            closing.append((index, op))
+
+    if closing:
+        await _batch_close(db, actor, branch_id, closing, results, now)
+    if borrowing:
+        await _batch_borrow(db, member, borrowing, results, now)
+
+    return results.items
+
+async def finish_returns(db) -> dict:
+    """Maintenance job: run the follow-ups of returns that stopped part way
+    (copy still borrowed, loan slot still held, transactions missing)"""
+    cutoff = datetime.now() - FINISH_RETURNS_AFTER
+    finished = 0
+    failed = 0
+    async for loan in db.loans.find({
+        "status": "returned",
+        "releasePending": {"$exists": True},
+        "returnedAt": {"$lt": cutoff}
+    }):
+        try:
+            await _finish_returns(db, loan_filter(loan), [loan])
+            finished += 1
+        except Exception as e:
+            print(f"✗ Could not finish return of {loan['_id']}: {e}")
+            failed += 1
+    return {"finished": finished, "failed": failed}
+
+async def reconcile_active_loans(db, batch_size: int = 1000) -> dict:
+    """Recompute every member's activeLoans counter from the loans collection"""
+    pipeline = [
+        {"$match": {"status": {"$in": ["active", "overdue"]}}},
+        {"$group": {"_id": "$memberId", "count": {"$sum": 1}}}
+    ]
+    actual = {
+        row["_id"]: row["count"]
+        async for row in db.loans.aggregate(pipeline)
+    }
+
+    scanned = 0
+    repaired = 0
+    ops = []
+    cursor = db.members.find({}, {"activeLoans": 1}).batch_size(batch_size)
+    async for member in cursor:
+        scanned += 1
+        expected = actual.get(member["_id"], 0)
+        if member.get("activeLoans") != expected:
+            # Guard on the value read so a concurrent borrow is not overwritten
+            ops.append(UpdateOne(
+                {"_id": member["_id"], "activeLoans": member.get("activeLoans")},
+                {"$set": {"activeLoans": expected}}
+            ))
+        if len(ops) >= batch_size:
+            repaired += (await db.members.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        repaired += (await db.members.bulk_write(ops, ordered=False)).modified_count
+
+    return {"scanned": scanned, "repaired": repaired}
@@ -0,0 +1,127 @@
+"""
+Daily transaction rollup - counts per (local date, branch, type) kept in `daily_stats`
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from zoneinfo import ZoneInfo
+from pymongo import ReplaceOne, UpdateOne
+from config import settings
+
+# Days are library days in STATS_TIMEZONE. Writers store naive wall-clock
+# time from datetime.now() on servers running in that zone, so a stored
+# value is bucketed as it is; only timezone-aware values are converted.
+STATS_TZ = ZoneInfo(settings.STATS_TIMEZONE)
+DATE_FORMAT = "%Y-%m-%d"
+
+def local_date(moment: datetime) -> str:
+    """Rollup date of a stored datetime"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(STATS_TZ)
+    return moment.strftime(DATE_FORMAT)
+
+def rollup_id(date: str, branch_id: str, tx_type: str) -> str:
+    return f"{date}|{branch_id}|{tx_type}"
+
+def rollup_ops(transactions: Iterable[dict], sign: int = 1) -> List[UpdateOne]:
+    """One $inc per (date, branch, type) touched by `transactions`"""
+    totals = defaultdict(lambda: [0, 0])
+    for tx in transactions:
+        key = (local_date(tx["createdAt"]), tx["branchId"], tx["type"])
+        totals[key][0] += 1
+        totals[key][1] += tx.get("amount") or 0
+
+    ops = []
+    for (date, branch_id, tx_type), (count, amount) in totals.items():
+        inc = {"count": sign * count}
+        if amount:
+            inc["amount"] = sign * amount
+        ops.append(UpdateOne(
+            {"_id": rollup_id(date, branch_id, tx_type)},
+            {
+                "$inc": inc,
+                "$setOnInsert": {"date": date, "branchId": branch_id, "type": tx_type}
+            },
+            upsert=True
+        ))
+    return ops
+
+async def record_rollup(db, transactions: List[dict], sign: int = 1):
+    """Count written (sign=1) or withdrawn (sign=-1) transactions.
+
+    The rollup is derived data: a failed update is logged rather than
+    failing the request, and backfill-daily-stats repairs it.
+    """
+    ops = rollup_ops(transactions, sign)
+    if not ops:
+        return
+    try:
+        await db.daily_stats.bulk_write(ops, ordered=False)
+    except Exception as e:
+        print(f"✗ Daily stats update failed: {e}")
+
+async def backfill_daily_stats(db) -> dict:
+    """Maintenance job: rebuild `daily_stats` from the transaction history.
+
+    Grouping runs on the server (on each shard, then merged). Transactions
+    recorded while it runs may be counted twice or not at all for their
+    day; rerun it during a quiet period to settle the counts.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": {
+                # Stored wall-clock time, read back unconverted as in local_date
+                "date": {"$dateToString": {"format": DATE_FORMAT, "date": "$createdAt"}},
+                "branchId": "$branchId",
+                "type": "$type"
+            },
+            "count": {"$sum": 1},
+            "amount": {"$sum": {"$ifNull": ["$amount", 0]}}
+        }}
+    ]
+
+    ops = []
+    ids = set()
+    async for row in db.transactions.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        doc = {
+            "_id": rollup_id(key["date"], key["branchId"], key["type"]),
+            "date": key["date"],
+            "branchId": key["branchId"],
+            "type": key["type"],
+            "count": row["count"]
+        }
+        if row["amount"]:
+            doc["amount"] = row["amount"]
+        ids.add(doc["_id"])
+        ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+
+    # One document per day, branch and type: a few thousand a year
+    if ops:
+        await db.daily_stats.bulk_write(ops, ordered=False)
+    removed = await db.daily_stats.delete_many({"_id": {"$nin": list(ids)}})
+    return {"buckets": len(ids), "removed": removed.deleted_count}
+
+async def transaction_trends(db, days: int, branch_id: Optional[str] = None) -> List[dict]:
+    """Transactions per local day and type for the last `days` days"""
+    since = local_date(datetime.now(STATS_TZ) - timedelta(days=days))
+    query = {"date": {"$gte": since}}
+    if branch_id:
+        query["branchId"] = branch_id
+
+    totals = defaultdict(lambda: {"count": 0, "amount": 0})
+    async for row in db.daily_stats.find(query, {"date": 1, "type": 1, "count": 1, "amount": 1}):
+        bucket = totals[(row["date"], row["type"])]
+        bucket["count"] += row["count"]
+        bucket["amount"] += row.get("amount", 0)
+
+    trends = []
+    for (date, tx_type), bucket in sorted(totals.items()):
+        if not bucket["count"]:
+            continue
+        item = {"_id": {"date": date, "type": tx_type}, "count": bucket["count"]}
+        if bucket["amount"]:
+            item["amount"] = bucket["amount"]
+        trends.append(item)
+    return trends
@@ -0,0 +1,141 @@
+"""
+Dashboard counts - a per-worker snapshot refreshed in the background
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+from config import settings
+from database import get_database
+
+# Totals come from collection metadata: cheap on sharded collections, and
+# possibly off by in-flight migrations or orphans, which a dashboard tolerates
+ESTIMATED_COUNTS = {
+    "totalBooks": "books",
+    "totalCopies": "copies",
+    "totalMembers": "members",
+    "totalLoans": "loans",
+}
+# Exact counts, each answered from an index
+EXACT_COUNTS = {
+    "activeLoans": ("loans", {"status": {"$in": ["active", "overdue"]}}),
+    "availableCopies": ("copies", {"status": "available"}),
+}
+
+async def compute_counts(db) -> dict:
+    """Run every count concurrently"""
+    names = list(ESTIMATED_COUNTS) + list(EXACT_COUNTS)
+    results = await asyncio.gather(
+        *(db[collection].estimated_document_count() for collection in ESTIMATED_COUNTS.values()),
+        *(db[collection].count_documents(query) for collection, query in EXACT_COUNTS.values())
+    )
+    return dict(zip(names, results))
+
+class DashboardStats:
+    """Stale-while-revalidate snapshot of the dashboard counts.
+
+    Only the first request waits for Mongo. After that, requests get the
+    snapshot from memory with its age; a loop refreshes it every
+    `interval` seconds, and writes that change the counts call
+    `invalidate()`, which refreshes it sooner but at most once per
+    `min_interval` however many writes arrive.
+    """
+
+    def __init__(self, interval: float, min_interval: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.snapshot: Optional[dict] = None
+        self.computed_at = 0.0  # time.monotonic()
+        self.generated_at: Optional[datetime] = None
+        self.dirty = False
+        self._refresh: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.invalidations = 0
+        self.last_refresh_ms: Optional[float] = None
+
+    async def refresh(self, db):
+        start_time = time.perf_counter()
+        snapshot = await compute_counts(db)
+        self.snapshot = snapshot
+        self.computed_at = time.monotonic()
+        self.generated_at = datetime.now()
+        self.refreshes += 1
+        self.last_refresh_ms = round((time.perf_counter() - start_time) * 1000, 2)
+
+    async def _refresh_when_due(self):
+        """Refresh until no invalidation arrived during the last one"""
+        while True:
+            wait = self.computed_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.dirty = False
+            try:
+                await self.refresh(await get_database())
+            except Exception as e:
+                print(f"✗ Dashboard stats refresh failed: {e}")
+                return
+            if not self.dirty:
+                return
+
+    def _schedule(self):
+        """Start a refresh unless one is already pending or running"""
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._refresh_when_due())
+
+    def invalidate(self):
+        """Counts changed in this worker"""
+        self.invalidations += 1
+        self.dirty = True
+        if self.snapshot is not None:
+            self._schedule()
+
+    async def get(self, db) -> dict:
+        if self.snapshot is None:
+            # Concurrent first requests share one computation
+            self._schedule()
+            await asyncio.shield(self._refresh)
+            if self.snapshot is None:
+                await self.refresh(db)
+        age = time.monotonic() - self.computed_at
+        if age > self.interval:
+            self._schedule()
+        return {
+            **self.snapshot,
+            "generatedAt": self.generated_at,
+            "snapshotAgeSeconds": round(age, 3)
+        }
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self._schedule()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        for task in (self._task, self._refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._refresh = None
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+            "lastRefreshMs": self.last_refresh_ms,
+            "snapshotAgeSeconds": round(time.monotonic() - self.computed_at, 3) if self.snapshot else None
+        }
+
+dashboard_stats = DashboardStats(
+    interval=settings.DASHBOARD_REFRESH_SECONDS,
+    min_interval=settings.DASHBOARD_MIN_REFRESH_SECONDS
+)
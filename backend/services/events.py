@@ -0,0 +1,212 @@
+"""
+Domain event bus - in-process subscribers, relayed between processes via a capped collection
+"""
+
+import asyncio
+import inspect
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from config import settings
+from utils.lease import WORKER_ID
+
+EVENTS_COLLECTION = "events"
+
+# Events published by the API
+BOOK_UPDATED = "book.updated"                # bookIds (created, edited or deleted)
+COPY_STATUS_CHANGED = "copy.status_changed"  # bookIds
+LOAN_CREATED = "loan.created"                # bookIds, memberId
+MEMBER_UPDATED = "member.updated"            # memberId
+
+def _event(event_type: str, payload: dict) -> dict:
+    return {"type": event_type, **payload, "origin": WORKER_ID, "at": datetime.now()}
+
+async def publish_once(db, event_type: str, **payload):
+    """Publish one event from a short script without starting a bus.
+
+    Written straight to the `events` collection; if it does not exist yet,
+    no API worker has started and there is nothing cached to invalidate.
+    """
+    if EVENTS_COLLECTION in await db.list_collection_names():
+        await db[EVENTS_COLLECTION].insert_one(_event(event_type, payload))
+
+class EventBus:
+    """Publish/subscribe for domain events, across uvicorn workers and scripts.
+
+    publish() runs this process's handlers before returning, so a worker
+    always sees its own writes. The event is also queued and written to
+    the capped `events` collection by a background task. Every worker
+    tails that collection and delivers events published elsewhere (other
+    workers, the import CLI, admin scripts) to its own handlers.
+
+    If a worker falls so far behind that the events it last saw have been
+    overwritten, it cannot know what changed and runs the resync
+    handlers, which drop whole caches.
+    """
+
+    def __init__(self, enabled: bool, collection_mb: int, flush_interval: float, max_outbox: int):
+        self.enabled = enabled
+        self.collection_bytes = collection_mb * 1024 * 1024
+        self.flush_interval = flush_interval
+        self.max_outbox = max_outbox
+        self._handlers: Dict[str, List[Callable]] = defaultdict(list)
+        self._resync_handlers: List[Callable] = []
+        self._outbox: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._tailer: Optional[asyncio.Task] = None
+        self._db = None
+        self.last_id = None
+        self.published = 0
+        self.relayed = 0
+        self.received = 0
+        self.dropped = 0
+        self.resyncs = 0
+
+    def subscribe(self, event_type: str, handler: Callable):
+        """handler(event) may be a plain function or a coroutine function"""
+        self._handlers[event_type].append(handler)
+
+    def on_resync(self, handler: Callable):
+        self._resync_handlers.append(handler)
+
+    async def publish(self, event_type: str, **payload):
+        event = _event(event_type, payload)
+        self.published += 1
+        await self._dispatch(event)
+        if self._writer is None:
+            return
+        if len(self._outbox) >= self.max_outbox:
+            # Other workers fall back on their cache TTLs for these
+            del self._outbox[0]
+            self.dropped += 1
+        self._outbox.append(event)
+        self._wakeup.set()
+
+    async def _dispatch(self, event: dict):
+        # Handlers keep derived state in step; one failing must not stop
+        # the others or fail the write that published the event
+        for handler in self._handlers.get(event["type"], []):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"✗ Event handler failed for {event['type']}: {e}")
+
+    def _resync(self):
+        self.resyncs += 1
+        for handler in self._resync_handlers:
+            try:
+                handler()
+            except Exception as e:
+                print(f"✗ Event resync handler failed: {e}")
+
+    async def _flush(self):
+        while self._outbox:
+            batch = self._outbox[:1000]
+            try:
+                await self._db[EVENTS_COLLECTION].insert_many(batch, ordered=True)
+            except Exception as e:
+                print(f"✗ Event relay failed: {e}")
+                return
+            del self._outbox[:len(batch)]
+            self.relayed += len(batch)
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._flush()
+            # Coalesce a burst of publishes into one insert
+            await asyncio.sleep(self.flush_interval)
+
+    async def _consume(self, cursor, skip_to=None) -> bool:
+        """Deliver events from `cursor`; while `skip_to` is set, skip up to
+        and including that event. Returns False if it was never found."""
+        async for event in cursor:
+            if skip_to is not None:
+                if event["_id"] == skip_to:
+                    skip_to = None
+                continue
+            self.last_id = event["_id"]
+            if event.get("origin") == WORKER_ID:
+                continue
+            self.received += 1
+            await self._dispatch(event)
+        return skip_to is None
+
+    async def _tail_loop(self):
+        collection = self._db[EVENTS_COLLECTION]
+        while True:
+            try:
+                # A capped collection keeps insertion order, but ObjectIds from
+                # different processes do not sort by it, so the tail restarts
+                # from the beginning and skips to the last event it saw
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                if not await self._consume(cursor, skip_to=self.last_id):
+                    self._resync()
+                while cursor.alive:
+                    await self._consume(cursor)
+                    await asyncio.sleep(self.flush_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ Event tail failed: {e}")
+            # An empty capped collection returns a dead cursor; retry shortly
+            await asyncio.sleep(1)
+
+    async def start(self, db, tail: bool = True):
+        """Start relaying; `tail=False` for scripts that only publish"""
+        if not self.enabled or self._writer is not None:
+            return
+        self._db = db
+        try:
+            await db.create_collection(EVENTS_COLLECTION, capped=True, size=self.collection_bytes)
+        except CollectionInvalid:
+            pass  # already created by another worker
+        except Exception as e:
+            print(f"✗ Could not create capped {EVENTS_COLLECTION} collection: {e}")
+        if tail:
+            # Only events published from now on are news to this worker
+            latest = await db[EVENTS_COLLECTION].find({}, {"_id": 1}).sort("$natural", -1).limit(1).to_list(length=1)
+            self.last_id = latest[0]["_id"] if latest else None
+            self._tailer = asyncio.create_task(self._tail_loop())
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        """Relay what is queued and stop (application shutdown)"""
+        for task in (self._tailer, self._writer):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._tailer = None
+        self._writer = None
+        if self._db is not None:
+            await self._flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "relaying": self._writer is not None,
+            "tailing": self._tailer is not None,
+            "published": self.published,
+            "relayed": self.relayed,
+            "received": self.received,
+            "queued": len(self._outbox),
+            "dropped": self.dropped,
+            "resyncs": self.resyncs
+        }
+
+event_bus = EventBus(
+    enabled=settings.EVENTS_ENABLED,
+    collection_mb=settings.EVENTS_COLLECTION_MB,
+    flush_interval=settings.EVENTS_FLUSH_INTERVAL_MS / 1000,
+    max_outbox=settings.EVENTS_MAX_OUTBOX
+)
@@ -0,0 +1,126 @@
+"""
+Facet counts for book search and browse, computed in the same $facet round trip
+"""
+
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from config import settings
+from utils.cache import TTLCache
+
+# Facet name -> $group stage and bucket order
+FACET_GROUPS = {
+    "lccCode": ({"_id": "$lccCode", "name": {"$first": "$lccName"}, "count": {"$sum": 1}}, {"count": -1, "_id": 1}),
+    "language": ({"_id": "$language", "count": {"$sum": 1}}, {"count": -1, "_id": 1}),
+    "publishedYear": ({"_id": "$publishedYear", "count": {"$sum": 1}}, {"_id": -1}),
+}
+MAX_BUCKETS = 100
+# In-memory search hits (BM25 or fuzzy) that facets and filters apply to
+MAX_RANKED_HITS = 1000
+
+def parse_facets(facets: Optional[str]) -> List[str]:
+    """Split the `facets` query parameter; unknown names are a 400"""
+    if not facets:
+        return []
+    names = [name.strip() for name in facets.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FACET_GROUPS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown facet(s): {', '.join(unknown)}. Available: {', '.join(FACET_GROUPS)}"
+        )
+    return list(dict.fromkeys(names))
+
+def facet_stages(names: List[str]) -> dict:
+    """$facet sub-pipelines, one per requested facet"""
+    return {
+        name: [
+            {"$group": FACET_GROUPS[name][0]},
+            {"$sort": FACET_GROUPS[name][1]},
+            {"$limit": MAX_BUCKETS}
+        ]
+        for name in names
+    }
+
+def shape_buckets(rows: List[dict]) -> List[dict]:
+    return [
+        {"value": row["_id"], "count": row["count"], **({"name": row["name"]} if "name" in row else {})}
+        for row in rows
+    ]
+
+class FacetCounts:
+    """Facet counts over the whole catalog, shared by unfiltered browse
+    and /books/categories/list so neither regroups `books` per request"""
+
+    def __init__(self, ttl: float):
+        self.cache = TTLCache(maxsize=len(FACET_GROUPS), ttl=ttl, name="facets")
+
+    async def get(self, db, names: List[str]) -> Dict[str, List[dict]]:
+        counts = {name: self.cache.get(name) for name in names}
+        missing = [name for name, buckets in counts.items() if buckets is None]
+        if missing:
+            result = await db.books.aggregate([{"$facet": facet_stages(missing)}]).to_list(length=1)
+            for name in missing:
+                counts[name] = shape_buckets(result[0][name]) if result else []
+                self.cache.set(name, counts[name])
+        return counts
+
+    def invalidate(self):
+        """Catalog changed in this worker"""
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+facet_counts = FacetCounts(ttl=settings.FACET_CACHE_TTL_SECONDS)
+
+async def facet_page(
+    db,
+    match: dict,
+    items: List[dict],
+    names: List[str],
+    annotate: Optional[List[dict]] = None
+) -> Tuple[List[dict], Dict[str, List[dict]]]:
+    """Run one aggregation returning a result page and facet counts.
+
+    `match` selects everything the facets count; `items` is the
+    sub-pipeline that picks the page out of it. `annotate` stages run
+    on the matched documents before they are split.
+    """
+    pipeline = [
+        {"$match": match},
+        *(annotate or []),
+        {"$facet": {"items": items, **facet_stages(names)}}
+    ]
+    result = await db.books.aggregate(pipeline).to_list(length=1)
+    if not result:
+        return [], {name: [] for name in names}
+    return result[0]["items"], {name: shape_buckets(result[0][name]) for name in names}
+
+async def facet_hits(
+    db,
+    hits: List[Tuple[str, float]],
+    limit: int,
+    names: List[str],
+    filter_query: Optional[dict] = None
+) -> Tuple[List[dict], Dict[str, List[dict]]]:
+    """Facets over in-memory search hits (BM25 or fuzzy), best first.
+
+    Counts cover the hits that pass `filter_query`; the page is the
+    best `limit` of them, ordered by their position in `hits`.
+    """
+    scores = dict(hits)
+    ids = list(scores)
+    books, facets = await facet_page(
+        db,
+        {"_id": {"$in": ids}, **(filter_query or {})},
+        [
+            {"$addFields": {"_rank": {"$indexOfArray": [ids, "$_id"]}}},
+            {"$sort": {"_rank": 1}},
+            {"$limit": limit}
+        ],
+        names
+    )
+    for book in books:
+        book.pop("_rank", None)
+        book["score"] = scores[book["_id"]]
+    return books, facets
@@ -0,0 +1,272 @@
+"""
+Typo-tolerant book search over a character-trigram index of title and author words
+"""
+
+import asyncio
+import heapq
+import time
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+from config import settings
+from services.search import field_text, fetch_ranked
+from services.facets import MAX_RANKED_HITS, facet_hits
+from utils.text import tokenize
+
+FUZZY_FIELDS = ("title", "authors")
+FUZZY_PROJECTION = {field: 1 for field in FUZZY_FIELDS}
+
+MIN_SIMILARITY = 0.3
+CANDIDATES_PER_WORD = 5
+# Candidates whose shared-trigram count is checked exactly, per query word
+VERIFY_LIMIT = 200
+# Book postings read per query; keeps common words inside the latency budget
+MAX_POSTINGS = 20000
+
+def trigrams(word: str) -> set:
+    """Padded character trigrams, as pg_trgm builds them"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting a transposition as one edit (optimal string
+    alignment), or limit + 1 once it is known to exceed `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            )
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class TrigramIndex:
+    """Vocabulary of title/author words with a trigram -> word postings map.
+
+    A query word is matched against the vocabulary, not against whole
+    titles: only its rarest trigrams are scanned (any word reaching
+    MIN_SIMILARITY must share one of them), the best candidates are
+    verified by exact trigram similarity and edit distance, and the books
+    containing them are scored. Removed books are tombstoned as in
+    BM25Index.
+    """
+
+    def __init__(self):
+        self.words: List[str] = []
+        self.word_ids: Dict[str, int] = {}
+        self.word_books: List[array] = []  # word id -> book docnums
+        self.grams: Dict[str, array] = {}  # trigram -> word ids
+        self.doc_ids: List[Optional[str]] = []
+        self.docnums: Dict[str, int] = {}
+        self.deleted = 0
+
+    def __len__(self) -> int:
+        return len(self.docnums)
+
+    def _word_id(self, word: str) -> int:
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = self.word_ids[word] = len(self.words)
+            self.words.append(word)
+            self.word_books.append(array("I"))
+            for gram in trigrams(word):
+                entry = self.grams.get(gram)
+                if entry is None:
+                    entry = self.grams[gram] = array("I")
+                entry.append(word_id)
+        return word_id
+
+    def add(self, book: dict):
+        book_id = book["_id"]
+        self.remove(book_id)
+
+        docnum = len(self.doc_ids)
+        self.doc_ids.append(book_id)
+        self.docnums[book_id] = docnum
+
+        words = set()
+        for field in FUZZY_FIELDS:
+            words.update(tokenize(field_text(book.get(field))))
+        for word in words:
+            if len(word) >= 2:
+                self.word_books[self._word_id(word)].append(docnum)
+
+    def remove(self, book_id: str):
+        docnum = self.docnums.pop(book_id, None)
+        if docnum is None:
+            return
+        self.doc_ids[docnum] = None
+        self.deleted += 1
+        if self.deleted > 1000 and self.deleted > len(self.doc_ids) // 5:
+            self.compact()
+
+    def compact(self):
+        """Drop tombstoned books from the word postings and renumber"""
+        remap = array("i", [-1]) * len(self.doc_ids)
+        doc_ids: List[Optional[str]] = []
+        for old, book_id in enumerate(self.doc_ids):
+            if book_id is not None:
+                remap[old] = len(doc_ids)
+                doc_ids.append(book_id)
+
+        self.word_books = [
+            array("I", (remap[docnum] for docnum in docs if remap[docnum] >= 0))
+            for docs in self.word_books
+        ]
+        self.doc_ids = doc_ids
+        self.docnums = {book_id: i for i, book_id in enumerate(doc_ids)}
+        self.deleted = 0
+
+    def similar_words(self, word: str, limit: int = CANDIDATES_PER_WORD) -> List[Tuple[int, float, int]]:
+        """Best (word id, trigram similarity, edit distance) matches for a word"""
+        query_grams = trigrams(word)
+        empty = array("I")
+        postings = sorted((self.grams.get(gram, empty) for gram in query_grams), key=len)
+
+        # Prefix filter: a match shares at least `need` trigrams with the
+        # query, so it must appear in one of the len - need + 1 rarest
+        need = max(1, int(MIN_SIMILARITY * len(query_grams) + 0.999))
+        shared: Dict[int, int] = {}
+        for word_ids in postings[:len(query_grams) - need + 1]:
+            for word_id in word_ids:
+                shared[word_id] = shared.get(word_id, 0) + 1
+
+        max_distance = max(1, len(word) // 3)
+        matches = []
+        for word_id, _ in heapq.nlargest(VERIFY_LIMIT, shared.items(), key=lambda item: item[1]):
+            if not self.word_books[word_id]:
+                continue
+            candidate = self.words[word_id]
+            candidate_grams = trigrams(candidate)
+            common = len(query_grams & candidate_grams)
+            similarity = common / (len(query_grams) + len(candidate_grams) - common)
+            if similarity < MIN_SIMILARITY:
+                continue
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((word_id, similarity, distance))
+
+        matches.sort(key=lambda match: (-match[1], match[2]))
+        return matches[:limit]
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top `limit` (book _id, score) pairs; each query word adds its best match"""
+        scores: Dict[int, float] = {}
+        words = set(tokenize(query))
+        for word in words:
+            budget = MAX_POSTINGS // len(words)
+            best: Dict[int, float] = {}
+            for word_id, similarity, distance in self.similar_words(word):
+                weight = similarity / (1 + distance)
+                docs = self.word_books[word_id]
+                for docnum in docs[:budget]:
+                    if weight > best.get(docnum, 0.0):
+                        best[docnum] = weight
+                budget -= min(len(docs), budget)
+                if budget <= 0:
+                    break
+            for docnum, weight in best.items():
+                scores[docnum] = scores.get(docnum, 0.0) + weight
+
+        doc_ids = self.doc_ids
+        top = heapq.nlargest(
+            limit,
+            ((docnum, score) for docnum, score in scores.items() if doc_ids[docnum] is not None),
+            key=lambda item: item[1]
+        )
+        return [(doc_ids[docnum], score) for docnum, score in top]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.docnums),
+            "tombstones": self.deleted,
+            "words": len(self.words),
+            "trigrams": len(self.grams),
+        }
+
+class FuzzySearch:
+    """Per-worker trigram index, built from the books collection in the
+    background after startup; searches skip the fuzzy pass until it is ready"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.ready = False
+        self.index = TrigramIndex()
+        self.build_ms = 0.0
+        self.queries = 0
+        self.last_query_ms = 0.0
+        self._builder: Optional[asyncio.Task] = None
+        # Books indexed from events while the build scans; the scan's
+        # copy may be older, so it skips them
+        self._touched: Set[str] = set()
+
+    async def _build(self, db):
+        start_time = time.perf_counter()
+        try:
+            async for book in db.books.find({}, FUZZY_PROJECTION).batch_size(1000):
+                if book["_id"] not in self._touched:
+                    self.index.add(book)
+        except Exception as e:
+            print(f"✗ Fuzzy search index build failed: {e}")
+            return
+        self._touched.clear()
+        self.ready = True
+        self.build_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        print(f"✓ Fuzzy search index ready: {len(self.index)} books")
+
+    async def start(self, db):
+        if self.enabled and self._builder is None:
+            self._builder = asyncio.create_task(self._build(db))
+
+    async def stop(self):
+        if self._builder is not None:
+            self._builder.cancel()
+            try:
+                await self._builder
+            except asyncio.CancelledError:
+                pass
+            self._builder = None
+
+    async def search(self, db, q: str, limit: int, filter_query: Optional[dict] = None) -> List[dict]:
+        start_time = time.perf_counter()
+        hits = self.index.search(q, MAX_RANKED_HITS if filter_query else limit)
+        self.queries += 1
+        self.last_query_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        return await fetch_ranked(db, hits, filter_query, limit)
+
+    async def facet_search(self, db, q: str, limit: int, facets: List[str], filter_query: Optional[dict] = None):
+        return await facet_hits(db, self.index.search(q, MAX_RANKED_HITS), limit, facets, filter_query)
+
+    def index_book(self, book: dict):
+        if self.enabled:
+            if not self.ready:
+                self._touched.add(book["_id"])
+            self.index.add(book)
+
+    def remove_book(self, book_id: str):
+        if self.enabled:
+            if not self.ready:
+                self._touched.add(book_id)
+            self.index.remove(book_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "buildMs": self.build_ms,
+            "queries": self.queries,
+            "lastQueryMs": self.last_query_ms,
+            **self.index.stats()
+        }
+
+fuzzy_search = FuzzySearch(enabled=settings.FUZZY_SEARCH_ENABLED)
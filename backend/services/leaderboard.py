@@ -0,0 +1,206 @@
+"""
+Most-borrowed books - a borrow counter per book plus daily per-book buckets
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne
+from config import settings
+from utils.cache import TTLCache
+from services.daily_stats import DATE_FORMAT, STATS_TZ, local_date
+
+# Longest leaderboard served; ranked lists are cached at this length
+MAX_K = 50
+
+def _bucket_id(date: str, book_id: str, branch_id: str) -> str:
+    return f"{date}|{book_id}|{branch_id}"
+
+async def record_borrows(db, loans: Iterable[dict], sign: int = 1) -> bool:
+    """Count checkouts (sign=-1 takes back a rolled-back one).
+
+    Bumps books.borrowCount and the (local date, book, branch) bucket in
+    `book_daily_stats`. Both are derived data: a failed update is logged
+    rather than failing the checkout, and rebuild-borrow-stats repairs it.
+    Returns whether the counts were applied, so a rollback takes back
+    only what was counted.
+    """
+    per_book = Counter()
+    per_bucket = Counter()
+    for loan in loans:
+        per_book[loan["bookId"]] += 1
+        per_bucket[(local_date(loan["borrowedAt"]), loan["bookId"], loan["branchId"])] += 1
+    if not per_book:
+        return True
+
+    try:
+        # Buckets carry the category so leaderboards filter without a $lookup
+        categories = {
+            book["_id"]: book.get("lccCode")
+            for book in await db.books.find({"_id": {"$in": list(per_book)}}, {"lccCode": 1}).to_list(length=None)
+        }
+        await asyncio.gather(
+            db.books.bulk_write([
+                UpdateOne({"_id": book_id}, {"$inc": {"borrowCount": sign * n}})
+                for book_id, n in per_book.items()
+            ], ordered=False),
+            db.book_daily_stats.bulk_write([
+                UpdateOne(
+                    {"_id": _bucket_id(date, book_id, branch_id)},
+                    {
+                        "$inc": {"count": sign * n},
+                        "$setOnInsert": {"date": date, "bookId": book_id, "branchId": branch_id, "lccCode": categories.get(book_id)}
+                    },
+                    upsert=True
+                )
+                for (date, book_id, branch_id), n in per_bucket.items()
+            ], ordered=False)
+        )
+    except Exception as e:
+        print(f"✗ Borrow counters update failed: {e}")
+        return False
+    return True
+
+class Leaderboard:
+    """Top borrowed books overall, or over the last `days` days.
+
+    All-time and unfiltered by branch is read straight from the
+    borrowCount index: K documents. Windows and branch filters sum the
+    daily buckets once per (days, branch, category) and cache the ranked
+    top MAX_K per worker for `ttl` seconds, so later reads are a slice.
+    """
+
+    def __init__(self, ttl: float):
+        self.cache = TTLCache(maxsize=512, ttl=ttl, name="leaderboard")
+
+    async def top(
+        self,
+        db,
+        limit: int,
+        days: Optional[int] = None,
+        branch_id: Optional[str] = None,
+        lcc_code: Optional[str] = None
+    ) -> List[dict]:
+        if days is None and branch_id is None:
+            query = {"borrowCount": {"$gt": 0}}
+            if lcc_code:
+                query["lccCode"] = lcc_code
+            books = await db.books.find(
+                query, {"title": 1, "authors": 1, "borrowCount": 1}
+            ).sort([("borrowCount", -1), ("_id", 1)]).limit(limit).to_list(length=limit)
+            return [_entry(book, book["borrowCount"]) for book in books]
+
+        ranked = await self._ranked(db, days, branch_id, lcc_code)
+        top = ranked[:limit]
+        books = {
+            book["_id"]: book
+            for book in await db.books.find(
+                {"_id": {"$in": [book_id for book_id, _ in top]}}, {"title": 1, "authors": 1}
+            ).to_list(length=limit)
+        }
+        return [_entry(books[book_id], count) for book_id, count in top if book_id in books]
+
+    async def _ranked(self, db, days, branch_id, lcc_code) -> List[Tuple[str, int]]:
+        key = (days, branch_id, lcc_code)
+        ranked = self.cache.get(key)
+        if ranked is None:
+            match: Dict[str, object] = {}
+            if days is not None:
+                since = datetime.now(STATS_TZ) - timedelta(days=days - 1)
+                match["date"] = {"$gte": local_date(since)}
+            if branch_id:
+                match["branchId"] = branch_id
+            if lcc_code:
+                match["lccCode"] = lcc_code
+            rows = await db.book_daily_stats.aggregate([
+                {"$match": match},
+                {"$group": {"_id": "$bookId", "count": {"$sum": "$count"}}},
+                {"$match": {"count": {"$gt": 0}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": MAX_K}
+            ]).to_list(length=MAX_K)
+            ranked = [(row["_id"], row["count"]) for row in rows]
+            self.cache.set(key, ranked)
+        return ranked
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+def _entry(book: dict, count: int) -> dict:
+    # Same shape as the loans aggregation this replaced
+    return {
+        "_id": book["_id"],
+        "bookId": book["_id"],
+        "title": book.get("title"),
+        "authors": book.get("authors"),
+        "borrowCount": count
+    }
+
+leaderboard = Leaderboard(ttl=settings.LEADERBOARD_CACHE_TTL_SECONDS)
+
+async def rebuild_borrow_stats(db, batch_size: int = 1000) -> dict:
+    """Maintenance job: recompute borrowCount and `book_daily_stats` from `loans`.
+
+    Checkouts made while it runs may be counted twice or not at all;
+    rerun it during a quiet period to settle the counts.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": {
+                # Stored wall-clock time, as in local_date
+                "date": {"$dateToString": {"format": DATE_FORMAT, "date": "$borrowedAt"}},
+                "bookId": "$bookId",
+                "branchId": "$branchId"
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id.bookId": 1}}
+    ]
+    # Buckets this run did not write are left over from deleted loans
+    run_at = datetime.now()
+
+    totals = Counter()
+    buckets = 0
+    docs = []
+
+    async def flush():
+        nonlocal docs
+        if not docs:
+            return
+        categories = {
+            book["_id"]: book.get("lccCode")
+            for book in await db.books.find(
+                {"_id": {"$in": list({doc["bookId"] for doc in docs})}}, {"lccCode": 1}
+            ).to_list(length=None)
+        }
+        await db.book_daily_stats.bulk_write([
+            ReplaceOne({"_id": doc["_id"]}, {**doc, "lccCode": categories.get(doc["bookId"])}, upsert=True)
+            for doc in docs
+        ], ordered=False)
+        docs = []
+
+    async for row in db.loans.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        docs.append({
+            "_id": _bucket_id(key["date"], key["bookId"], key["branchId"]),
+            "date": key["date"],
+            "bookId": key["bookId"],
+            "branchId": key["branchId"],
+            "count": row["count"],
+            "rebuiltAt": run_at
+        })
+        totals[key["bookId"]] += row["count"]
+        buckets += 1
+        if len(docs) >= batch_size:
+            await flush()
+    await flush()
+    removed = await db.book_daily_stats.delete_many({"rebuiltAt": {"$ne": run_at}})
+
+    ops = [UpdateOne({"_id": book_id}, {"$set": {"borrowCount": n}}) for book_id, n in totals.items()]
+    async for book in db.books.find({"borrowCount": {"$gt": 0}}, {"_id": 1}).batch_size(batch_size):
+        if book["_id"] not in totals:
+            ops.append(UpdateOne({"_id": book["_id"]}, {"$set": {"borrowCount": 0}}))
+    for start in range(0, len(ops), batch_size):
+        await db.books.bulk_write(ops[start:start + batch_size], ordered=False)
+    return {"books": len(totals), "buckets": buckets, "removedBuckets": removed.deleted_count}
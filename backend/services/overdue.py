@@ -0,0 +1,124 @@
+"""
+Overdue sweeper - flips past-due active loans to "overdue" in the background
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+from config import settings
+from database import get_database
+from utils.lease import acquire_lease, release_lease, WORKER_ID
+
+JOB_NAME = "overdue-sweeper"
+
+class OverdueSweeper:
+    """Periodic job run by whichever worker holds the sweeper lease.
+
+    Each run only scans loans whose dueAt falls between the previous
+    watermark and now, using the (status, dueAt) index, and flips them in
+    batches of `batch_size`.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.flipped_total = 0
+        self.last_run: Optional[dict] = None
+
+    async def run_once(self, db) -> Optional[dict]:
+        """Sweep once if this worker holds the lease; returns run metrics"""
+        # Lease outlives the interval so a slow run is not taken over mid-way
+        if not await acquire_lease(db, JOB_NAME, self.interval * 2):
+            return None
+
+        started_at = datetime.now()
+        start_time = time.perf_counter()
+
+        state = await db.jobs.find_one({"_id": JOB_NAME}, {"watermark": 1}) or {}
+        watermark = state.get("watermark")
+
+        due_range = {"$lt": started_at}
+        if watermark is not None:
+            due_range["$gte"] = watermark
+
+        flipped = 0
+        batches = 0
+        while True:
+            batch = await db.loans.find(
+                {"status": "active", "dueAt": due_range},
+                {"_id": 1}
+            ).sort("dueAt", 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not batch:
+                break
+
+            result = await db.loans.update_many(
+                {"_id": {"$in": [loan["_id"] for loan in batch]}, "status": "active"},
+                {"$set": {"status": "overdue"}}
+            )
+            flipped += result.modified_count
+            batches += 1
+            if len(batch) < self.batch_size:
+                break
+
+        metrics = {
+            "worker": WORKER_ID,
+            "startedAt": started_at,
+            "durationMs": round((time.perf_counter() - start_time) * 1000, 2),
+            "watermark": watermark,
+            "flipped": flipped,
+            "batches": batches
+        }
+        await db.jobs.update_one(
+            {"_id": JOB_NAME},
+            {"$set": {"watermark": started_at, "lastRun": metrics}}
+        )
+
+        self.runs += 1
+        self.flipped_total += flipped
+        self.last_run = metrics
+        return metrics
+
+    async def _loop(self):
+        while True:
+            try:
+                db = await get_database()
+                await self.run_once(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ Overdue sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await release_lease(await get_database(), JOB_NAME)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "intervalSeconds": self.interval,
+            "runs": self.runs,
+            "flipped": self.flipped_total,
+            "lastRun": self.last_run
+        }
+
+overdue_sweeper = OverdueSweeper(
+    interval=settings.OVERDUE_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.OVERDUE_SWEEP_BATCH_SIZE
+)
@@ -0,0 +1,371 @@
+"""
+Search backends for /books/search - Mongo $text or an in-memory BM25 index
+"""
+
+import heapq
+import math
+import os
+import pickle
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from config import settings
+from utils.text import TEXT_VERSION, fold_query, normalize, tokenize
+from services.facets import MAX_RANKED_HITS, facet_hits, facet_page
+
+# Same weights as books_fulltext_idx in scripts/create-indexes.js
+FIELD_WEIGHTS = {"title": 10, "authors": 5, "subjects": 3, "description": 1}
+SEARCH_PROJECTION = {field: 1 for field in FIELD_WEIGHTS}
+# Books whose search text changed this close before a snapshot's watermark
+# are reindexed too, in case the writer's clock is behind the builder's
+SNAPSHOT_CLOCK_SKEW = timedelta(minutes=5)
+
+def field_text(value) -> str:
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value) if value else ""
+
+def search_fields(book: dict) -> dict:
+    """Folded copies of the searchable fields, stored on the book as `search`
+    and covered by books_fulltext_idx, so "ha noi" finds "Hà Nội" via $text.
+    `at` marks when they were written, for BM25 snapshot catch-up."""
+    fields = {field: normalize(field_text(book.get(field))) for field in FIELD_WEIGHTS}
+    fields["v"] = TEXT_VERSION
+    fields["at"] = datetime.now(timezone.utc)
+    return fields
+
+async def backfill_search_fields(db, batch_size: int = 1000) -> dict:
+    """Maintenance job: (re)compute `search` on books written before it
+    existed or with an older TEXT_VERSION; safe to rerun after a crash"""
+    scanned = 0
+    updated = 0
+    ops = []
+    cursor = db.books.find({"search.v": {"$ne": TEXT_VERSION}}, SEARCH_PROJECTION).batch_size(batch_size)
+    async for book in cursor:
+        scanned += 1
+        ops.append(UpdateOne({"_id": book["_id"]}, {"$set": {"search": search_fields(book)}}))
+        if len(ops) >= batch_size:
+            result = await db.books.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+            ops = []
+    if ops:
+        result = await db.books.bulk_write(ops, ordered=False)
+        updated += result.modified_count
+    return {"scanned": scanned, "updated": updated}
+
+class BM25Index:
+    """Compact inverted index with BM25 scoring over weighted fields.
+
+    Each term maps to two parallel arrays: document numbers (ascending)
+    and weighted term frequencies. A field's tokens count `weight` times,
+    so a title match weighs 10x a description match, as in $text.
+
+    Updates append a new document number and tombstone the old one;
+    `compact()` rewrites the postings once tombstones pile up.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_ids: List[Optional[str]] = []  # docnum -> book _id (None if deleted)
+        self.doc_lens = array("f")
+        self.docnums: Dict[str, int] = {}  # book _id -> live docnum
+        self.total_len = 0.0
+        self.watermark: Optional[datetime] = None  # set on snapshots
+        self.deleted = 0
+
+    def __len__(self) -> int:
+        return len(self.docnums)
+
+    def add(self, book: dict):
+        """Index a book, replacing any previous version"""
+        book_id = book["_id"]
+        self.remove(book_id)
+
+        freqs: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(field_text(book.get(field))):
+                freqs[token] = freqs.get(token, 0.0) + weight
+                length += weight
+
+        docnum = len(self.doc_ids)
+        self.doc_ids.append(book_id)
+        self.doc_lens.append(length)
+        self.docnums[book_id] = docnum
+        self.total_len += length
+
+        for term, tf in freqs.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("f"))
+            entry[0].append(docnum)
+            entry[1].append(tf)
+
+    def remove(self, book_id: str):
+        docnum = self.docnums.pop(book_id, None)
+        if docnum is None:
+            return
+        self.doc_ids[docnum] = None
+        self.total_len -= self.doc_lens[docnum]
+        self.deleted += 1
+        if self.deleted > 1000 and self.deleted > len(self.doc_ids) // 5:
+            self.compact()
+
+    def compact(self):
+        """Drop tombstoned documents and renumber the rest"""
+        remap = array("i", [-1]) * len(self.doc_ids)
+        doc_ids: List[Optional[str]] = []
+        doc_lens = array("f")
+        for old, book_id in enumerate(self.doc_ids):
+            if book_id is not None:
+                remap[old] = len(doc_ids)
+                doc_ids.append(book_id)
+                doc_lens.append(self.doc_lens[old])
+
+        postings = {}
+        for term, (docs, tfs) in self.postings.items():
+            new_docs, new_tfs = array("I"), array("f")
+            for docnum, tf in zip(docs, tfs):
+                if remap[docnum] >= 0:
+                    new_docs.append(remap[docnum])
+                    new_tfs.append(tf)
+            if new_docs:
+                postings[term] = (new_docs, new_tfs)
+
+        self.postings = postings
+        self.doc_ids = doc_ids
+        self.doc_lens = doc_lens
+        self.docnums = {book_id: i for i, book_id in enumerate(doc_ids)}
+        self.deleted = 0
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top `limit` (book _id, score) pairs for a query"""
+        live = len(self.docnums)
+        if not live:
+            return []
+        avg_len = self.total_len / live or 1.0
+        k1, b = self.k1, self.b
+        doc_ids, doc_lens = self.doc_ids, self.doc_lens
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            docs, tfs = entry
+            df = len(docs)
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            for docnum, tf in zip(docs, tfs):
+                if doc_ids[docnum] is None:
+                    continue
+                norm = k1 * (1 - b + b * doc_lens[docnum] / avg_len)
+                scores[docnum] = scores.get(docnum, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(doc_ids[docnum], score) for docnum, score in top]
+
+    def save(self, path: str, watermark: datetime):
+        """Write a snapshot for fast startup; `watermark` is when the scan
+        it was built from started"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "version": TEXT_VERSION,
+                "watermark": watermark,
+                "k1": self.k1, "b": self.b,
+                "postings": self.postings,
+                "doc_ids": self.doc_ids,
+                "doc_lens": self.doc_lens,
+                "total_len": self.total_len,
+                "deleted": self.deleted,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("version") != TEXT_VERSION:
+            raise ValueError("snapshot was built with older text normalization")
+        if data.get("watermark") is None:
+            raise ValueError("snapshot has no watermark; rebuild it with jobs.py build-search-index")
+        index = cls(data["k1"], data["b"])
+        index.watermark = data["watermark"]
+        index.postings = data["postings"]
+        index.doc_ids = data["doc_ids"]
+        index.doc_lens = data["doc_lens"]
+        index.total_len = data["total_len"]
+        index.deleted = data["deleted"]
+        index.docnums = {
+            book_id: i for i, book_id in enumerate(index.doc_ids) if book_id is not None
+        }
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.docnums),
+            "tombstones": self.deleted,
+            "terms": len(self.postings),
+            "postings": sum(len(docs) for docs, _ in self.postings.values()),
+        }
+
+def build_index(books: Iterable[dict]) -> BM25Index:
+    """Build an index from an iterable of book documents"""
+    index = BM25Index()
+    for book in books:
+        index.add(book)
+    return index
+
+async def load_index(db) -> BM25Index:
+    """Build an index by streaming the books collection"""
+    index = BM25Index()
+    async for book in db.books.find({}, SEARCH_PROJECTION).batch_size(1000):
+        index.add(book)
+    return index
+
+async def build_snapshot(db) -> dict:
+    """Maintenance job: write a fresh snapshot for BM25 workers to load.
+
+    This is the only writer of the snapshot; workers load it and catch up
+    on books changed since from the collection.
+    """
+    watermark = datetime.now(timezone.utc)
+    index = await load_index(db)
+    index.save(settings.SEARCH_SNAPSHOT_PATH, watermark)
+    return {"path": settings.SEARCH_SNAPSHOT_PATH, **index.stats()}
+
+async def fetch_ranked(
+    db,
+    hits: List[Tuple[str, float]],
+    filter_query: Optional[dict] = None,
+    limit: Optional[int] = None
+) -> List[dict]:
+    """Load the books for (book _id, score) hits that pass `filter_query`,
+    in hit order, with scores"""
+    if not hits:
+        return []
+    query = {"_id": {"$in": [book_id for book_id, _ in hits]}, **(filter_query or {})}
+    books = await db.books.find(query).to_list(length=len(hits))
+    by_id = {book["_id"]: book for book in books}
+    results = []
+    for book_id, score in hits:
+        book = by_id.get(book_id)
+        if book is not None:
+            book["score"] = score
+            results.append(book)
+    return results[:limit]
+
+class MongoTextSearch:
+    """Default backend: the books_fulltext_idx $text index"""
+
+    name = "mongo"
+
+    async def start(self, db):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def search(self, db, q: str, limit: int, filter_query: Optional[dict] = None) -> List[dict]:
+        # Matches the folded `search` fields, so diacritics are optional
+        cursor = db.books.find(
+            {"$text": {"$search": fold_query(q)}, **(filter_query or {})},
+            {"score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def facet_search(self, db, q: str, limit: int, facets: List[str], filter_query: Optional[dict] = None):
+        """Top results plus facet counts over every match, in one aggregation"""
+        return await facet_page(
+            db,
+            {"$text": {"$search": fold_query(q)}, **(filter_query or {})},
+            [{"$sort": {"score": -1}}, {"$limit": limit}],
+            facets,
+            annotate=[{"$addFields": {"score": {"$meta": "textScore"}}}]
+        )
+
+    def index_book(self, book: dict):
+        pass
+
+    def remove_book(self, book_id: str):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+class BM25Search:
+    """In-memory BM25 backend, kept current by book.updated events.
+
+    Each worker holds its own index, loaded from the snapshot written by
+    `jobs.py build-search-index` plus the books whose search text changed
+    since, or rebuilt from the books collection when there is none.
+    Books deleted since the snapshot stay in the index but are dropped
+    from results, which are always fetched from the collection.
+    """
+
+    name = "bm25"
+
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self.index = BM25Index()
+        self.loaded_from = None
+        self.caught_up = 0
+        self.build_ms = 0.0
+
+    async def start(self, db):
+        start_time = time.perf_counter()
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                index = BM25Index.load(self.snapshot_path)
+                since = index.watermark - SNAPSHOT_CLOCK_SKEW
+                async for book in db.books.find({"search.at": {"$gte": since}}, SEARCH_PROJECTION).batch_size(1000):
+                    index.add(book)
+                    self.caught_up += 1
+                self.index = index
+                self.loaded_from = "snapshot"
+            except Exception as e:
+                print(f"✗ Could not load search snapshot: {e}")
+
+        if self.loaded_from is None:
+            self.index = await load_index(db)
+            self.loaded_from = "database"
+        self.build_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        print(f"✓ Search index ready from {self.loaded_from}: {len(self.index)} books")
+
+    async def stop(self):
+        # The snapshot is shared by every worker, so only the job writes it
+        pass
+
+    async def search(self, db, q: str, limit: int, filter_query: Optional[dict] = None) -> List[dict]:
+        # A filter may drop hits, so rank a wider set when one is given
+        hits = self.index.search(q, MAX_RANKED_HITS if filter_query else limit)
+        return await fetch_ranked(db, hits, filter_query, limit)
+
+    async def facet_search(self, db, q: str, limit: int, facets: List[str], filter_query: Optional[dict] = None):
+        return await facet_hits(db, self.index.search(q, MAX_RANKED_HITS), limit, facets, filter_query)
+
+    def index_book(self, book: dict):
+        self.index.add(book)
+
+    def remove_book(self, book_id: str):
+        self.index.remove(book_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "loadedFrom": self.loaded_from,
+            "caughtUp": self.caught_up,
+            "buildMs": self.build_ms,
+            **self.index.stats()
+        }
+
+def create_search_backend():
+    if settings.SEARCH_BACKEND == "bm25":
+        return BM25Search(settings.SEARCH_SNAPSHOT_PATH)
+    return MongoTextSearch()
+
+search_backend = create_search_backend()
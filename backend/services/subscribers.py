@@ -0,0 +1,63 @@
+"""
+Event subscribers - the per-worker caches, counters and indexes kept current by domain events
+"""
+
+from database import get_database
+from middleware.auth import invalidate_principal, principal_cache
+from services.events import EventBus, BOOK_UPDATED, COPY_STATUS_CHANGED, LOAN_CREATED, MEMBER_UPDATED
+from services.catalog_cache import catalog_cache
+from services.search import search_backend
+from services.fuzzy import fuzzy_search
+from services.suggest import suggester
+from services.facets import facet_counts
+from services.dashboard import dashboard_stats
+
+async def on_book_updated(event: dict):
+    """Books were created, edited or deleted: reindex what is left of them"""
+    for book_id in event["bookIds"]:
+        catalog_cache.invalidate_book(book_id)
+    facet_counts.invalidate()
+    dashboard_stats.invalidate()
+
+    db = await get_database()
+    found = set()
+    async for book in db.books.find({"_id": {"$in": event["bookIds"]}}):
+        found.add(book["_id"])
+        search_backend.index_book(book)
+        fuzzy_search.index_book(book)
+        suggester.index_book(book)
+    for book_id in event["bookIds"]:
+        if book_id not in found:
+            search_backend.remove_book(book_id)
+            fuzzy_search.remove_book(book_id)
+            suggester.remove_book(book_id)
+
+def on_copy_status_changed(event: dict):
+    for book_id in event["bookIds"]:
+        catalog_cache.invalidate_copies(book_id)
+    dashboard_stats.invalidate()
+
+def on_loan_created(event: dict):
+    # One entry per loan, so a book borrowed twice counts twice
+    for book_id in event["bookIds"]:
+        suggester.record_loan(book_id)
+    dashboard_stats.invalidate()
+
+def on_member_updated(event: dict):
+    invalidate_principal(event["memberId"])
+    dashboard_stats.invalidate()
+
+def on_resync():
+    """Events were missed: drop everything they would have invalidated"""
+    catalog_cache.clear()
+    principal_cache.clear()
+    facet_counts.invalidate()
+    dashboard_stats.invalidate()
+    print("✗ Missed catalog events; search and suggestion indexes may be stale until restart")
+
+def register_subscribers(bus: EventBus):
+    bus.subscribe(BOOK_UPDATED, on_book_updated)
+    bus.subscribe(COPY_STATUS_CHANGED, on_copy_status_changed)
+    bus.subscribe(LOAN_CREATED, on_loan_created)
+    bus.subscribe(MEMBER_UPDATED, on_member_updated)
+    bus.on_resync(on_resync)
@@ -0,0 +1,154 @@
+"""
+Prefix autocomplete over normalized titles, authors and subjects
+"""
+
+import heapq
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from utils.cache import TTLCache
+from utils.text import normalize
+
+SUGGEST_PROJECTION = {"title": 1, "authors": 1, "subjects": 1, "borrowCount": 1}
+# Completions kept per memoized prefix; the endpoint's limit is capped to this
+MAX_SUGGESTIONS = 20
+
+def _book_phrases(book: dict) -> List[Tuple[str, str]]:
+    phrases = [("title", book.get("title"))]
+    phrases += [("author", name) for name in book.get("authors") or []]
+    phrases += [("subject", subject) for subject in book.get("subjects") or []]
+    return [(kind, text) for kind, text in phrases if normalize(text)]
+
+class Suggester:
+    """Sorted array of phrase keys with popularity weights.
+
+    A key is the normalized phrase plus its kind, so a prefix maps to one
+    contiguous range found with bisect. Each phrase weighs one point per
+    book that carries it plus that book's loan count. Top completions per
+    prefix are memoized: catalog writes drop the memo for every prefix of
+    the keys they touch, while loan counts are picked up as entries expire.
+    """
+
+    def __init__(self, enabled: bool, cache_ttl: float):
+        self.enabled = enabled
+        self.keys: List[str] = []
+        self.entries: Dict[str, list] = {}  # key -> [text, kind, bookId, weight, refs]
+        self.books: Dict[str, list] = {}    # book _id -> [keys, loans]
+        self.memo = TTLCache(maxsize=10000, ttl=cache_ttl, name="suggestions")
+        self.build_ms = 0.0
+
+    def _forget_prefixes(self, key: str):
+        phrase = key.split("\x00", 1)[0]
+        for end in range(1, len(phrase) + 1):
+            self.memo.invalidate(phrase[:end])
+
+    def _add_phrase(self, kind: str, text: str, book_id: str, weight: int, keep_sorted: bool = True) -> str:
+        key = f"{normalize(text)}\x00{kind}"
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [text, kind, book_id, weight, 1]
+            if keep_sorted:
+                insort(self.keys, key)
+                self._forget_prefixes(key)
+        else:
+            entry[3] += weight
+            entry[4] += 1
+        return key
+
+    def _remove_phrase(self, key: str, weight: int):
+        entry = self.entries[key]
+        entry[3] -= weight
+        entry[4] -= 1
+        if entry[4] <= 0:
+            del self.entries[key]
+            del self.keys[bisect_left(self.keys, key)]
+            self._forget_prefixes(key)
+
+    def add_book(self, book: dict, loans: Optional[int] = None):
+        """Index (or re-index) a book's phrases, keeping its loan count"""
+        previous = self.books.get(book["_id"])
+        if loans is None:
+            loans = previous[1] if previous else 0
+        self.remove_book(book["_id"])
+
+        keys = tuple(
+            self._add_phrase(kind, text, book["_id"], 1 + loans)
+            for kind, text in _book_phrases(book)
+        )
+        self.books[book["_id"]] = [keys, loans]
+
+    def remove_book(self, book_id: str):
+        previous = self.books.pop(book_id, None)
+        if previous is None:
+            return
+        keys, loans = previous
+        for key in keys:
+            self._remove_phrase(key, 1 + loans)
+
+    def record_loan(self, book_id: str):
+        book = self.books.get(book_id)
+        if book is None:
+            return
+        book[1] += 1
+        for key in book[0]:
+            self.entries[key][3] += 1
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """Most popular completions of a prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        top = self.memo.get(prefix)
+        if top is None:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + "\uffff", start)
+            entries = self.entries
+            top = [
+                {"text": entry[0], "type": entry[1], "bookId": entry[2] if entry[1] == "title" else None, "score": entry[3]}
+                for entry in heapq.nlargest(
+                    MAX_SUGGESTIONS,
+                    (entries[key] for key in self.keys[start:end]),
+                    key=lambda entry: entry[3]
+                )
+            ]
+            self.memo.set(prefix, top)
+        return top[:limit]
+
+    async def start(self, db):
+        """Build from the catalog, weighted by each book's borrowCount
+        (kept by record_borrows, rebuilt by jobs.py rebuild-borrow-stats)"""
+        if not self.enabled:
+            return
+        start_time = time.perf_counter()
+        self.keys, self.entries, self.books = [], {}, {}
+        async for book in db.books.find({}, SUGGEST_PROJECTION).batch_size(1000):
+            loans = book.get("borrowCount", 0)
+            keys = tuple(
+                self._add_phrase(kind, text, book["_id"], 1 + loans, keep_sorted=False)
+                for kind, text in _book_phrases(book)
+            )
+            self.books[book["_id"]] = [keys, loans]
+        self.keys = sorted(self.entries)
+        self.memo.clear()
+        self.build_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        print(f"✓ Suggestions ready: {len(self.keys)} phrases")
+
+    def index_book(self, book: dict):
+        if self.enabled:
+            self.add_book(book)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "phrases": len(self.keys),
+            "books": len(self.books),
+            "buildMs": self.build_ms,
+            "memo": self.memo.stats()
+        }
+
+suggester = Suggester(
+    enabled=settings.SUGGEST_ENABLED,
+    cache_ttl=settings.SUGGEST_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,177 @@
+"""
+Transaction audit log writer with strict (synchronous) and fast (write-behind) modes
+"""
+
+import asyncio
+import time
+from typing import List, Optional
+from pymongo.errors import BulkWriteError
+from config import settings
+from database import get_database
+from services.daily_stats import record_rollup
+
+DUPLICATE_KEY = 11000
+
+class TransactionLog:
+    """Records audit transactions for circulation events.
+
+    strict: every record() awaits its own insert, as before.
+    fast:   record() queues the documents and returns; a background task
+            flushes them with insert_many when `batch_size` documents are
+            waiting or every `flush_interval` seconds. Transactions show up
+            in history up to one interval late, and queued documents are
+            lost if the process is killed (a clean shutdown drains them).
+
+    Either way, the daily_stats rollup counts a transaction once its
+    insert succeeds, in one bulk $inc per insert.
+    """
+
+    def __init__(self, mode: str, batch_size: int, flush_interval: float, ordered: bool, max_queue: int):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ordered = ordered
+        self.max_queue = max_queue
+        self._queue: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.flushes = 0
+        self.written = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def fast(self) -> bool:
+        return self.mode == "fast" and self._task is not None
+
+    async def record(self, db, docs: List[dict]):
+        """Write (strict) or enqueue (fast) transaction documents"""
+        if not docs:
+            return
+        if not self.fast or len(self._queue) >= self.max_queue:
+            # Strict mode, or the queue is full: apply backpressure
+            try:
+                await db.transactions.insert_many(docs, ordered=self.ordered)
+            except BulkWriteError as e:
+                await record_rollup(db, self._inserted(docs, e))
+                raise
+            await record_rollup(db, docs)
+            return
+
+        self._queue.extend(docs)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def discard(self, db, tx_ids: List[str]):
+        """Withdraw transactions of an operation that was rolled back"""
+        if self._flush_lock is None:
+            await self._discard(db, tx_ids)
+            return
+        # A flush takes its batch off the queue before the insert lands;
+        # wait for it so those documents are found in the collection
+        async with self._flush_lock:
+            await self._discard(db, tx_ids)
+
+    async def _discard(self, db, tx_ids: List[str]):
+        ids = set(tx_ids)
+        self._queue = [doc for doc in self._queue if doc["_id"] not in ids]
+        # Only what was written had been counted in the rollup
+        written = await db.transactions.find(
+            {"_id": {"$in": tx_ids}}, {"branchId": 1, "type": 1, "createdAt": 1, "amount": 1}
+        ).to_list(length=None)
+        if written:
+            await db.transactions.delete_many({"_id": {"$in": [doc["_id"] for doc in written]}})
+            await record_rollup(db, written, sign=-1)
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._flush_lock:
+            while self._queue:
+                docs = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                start_time = time.perf_counter()
+                retry = await self._write(docs)
+                self.last_flush_ms = round((time.perf_counter() - start_time) * 1000, 2)
+                if retry:
+                    # Keep failed documents at the front for the next flush
+                    self._queue[:0] = retry
+                    self.failed_flushes += 1
+                    break
+
+    async def _write(self, docs: List[dict]) -> List[dict]:
+        """Insert a batch; returns the documents that still need writing"""
+        db = await get_database()
+        try:
+            await db.transactions.insert_many(docs, ordered=self.ordered)
+            self.flushes += 1
+            self.written += len(docs)
+            await record_rollup(db, docs)
+            return []
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            self.written += e.details.get("nInserted", 0)
+            await record_rollup(db, self._inserted(docs, e))
+            # Duplicate keys mean an earlier attempt already stored the document
+            failed = {err["index"] for err in errors if err["code"] != DUPLICATE_KEY}
+            if self.ordered and errors:
+                first = errors[0]["index"]
+                return docs[first:] if first in failed else docs[first + 1:]
+            return [docs[i] for i in sorted(failed)]
+        except Exception as e:
+            print(f"✗ Transaction log flush failed: {e}")
+            return docs
+
+    def _inserted(self, docs: List[dict], error: BulkWriteError) -> List[dict]:
+        """Documents a failed insert_many did write"""
+        errors = error.details.get("writeErrors", [])
+        if self.ordered:
+            return docs[:errors[0]["index"]] if errors else docs
+        failed = {err["index"] for err in errors}
+        return [doc for i, doc in enumerate(docs) if i not in failed]
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self.mode == "fast" and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._stopping = False
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the flusher and drain the queue (application shutdown)"""
+        if self._task is not None:
+            # Let the loop finish its current flush rather than cancelling
+            # it mid-write, then write whatever is left
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "queued": len(self._queue),
+            "flushes": self.flushes,
+            "written": self.written,
+            "failedFlushes": self.failed_flushes,
+            "lastFlushMs": self.last_flush_ms
+        }
+
+transaction_log = TransactionLog(
+    mode=settings.TXLOG_MODE,
+    batch_size=settings.TXLOG_BATCH_SIZE,
+    flush_interval=settings.TXLOG_FLUSH_INTERVAL_MS / 1000,
+    ordered=settings.TXLOG_ORDERED,
+    max_queue=settings.TXLOG_MAX_QUEUE
+)
@@ -0,0 +1,131 @@
+"""
+In-process LRU cache with TTL expiry and hit/miss counters
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+import bson
+
+MISSING = object()
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Not shared between uvicorn workers: each process keeps its own copy,
+    so writes must invalidate entries explicitly.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _removed(self, value: Any) -> None:
+        """Hook called whenever an entry leaves the cache"""
+
+    def _over_capacity(self) -> bool:
+        return len(self._data) > self.maxsize
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, MISSING)
+        if entry is MISSING:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._removed(value)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self.invalidate(key)
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        while self._data and self._over_capacity():
+            _, (old_value, _) = self._data.popitem(last=False)
+            self._removed(old_value)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._removed(entry[0])
+
+    def clear(self) -> None:
+        for value, _ in self._data.values():
+            self._removed(value)
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[1] >= time.monotonic()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxSize": self.maxsize,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class BSONCache(TTLCache):
+    """TTLCache that stores values as encoded BSON under a byte budget.
+
+    An encoded document takes a fraction of the memory of the equivalent
+    Python dict, so a large catalog fits in a fixed budget. Every get()
+    decodes a fresh copy, so callers may mutate what they receive.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int, name: str = "cache"):
+        super().__init__(maxsize, ttl, name)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+    def _removed(self, value: bytes) -> None:
+        self.bytes -= len(value)
+
+    def _over_capacity(self) -> bool:
+        return len(self._data) > self.maxsize or self.bytes > self.max_bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raw = super().get(key, MISSING)
+        if raw is MISSING:
+            return default
+        return bson.decode(raw)["v"]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        raw = bson.encode({"v": value})
+        self.bytes += len(raw)
+        super().set(key, raw)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+        }
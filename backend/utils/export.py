@@ -0,0 +1,100 @@
+"""
+Streaming NDJSON/CSV export of Motor cursors with optional gzip
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, date
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, list) and all(not isinstance(v, (dict, list)) for v in value):
+        return "; ".join(str(v) for v in value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    return value
+
+def _csv_value(doc: dict, column: str):
+    for key in column.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+async def _encode(cursor, fmt: str, columns: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    """One chunk per cursor batch, so memory stays at one batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    count = 0
+    async for doc in cursor:
+        if writer:
+            writer.writerow([_csv_cell(_csv_value(doc, column)) for column in columns])
+        else:
+            buffer.write(json.dumps(doc, default=_json_default, ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(
+    cursor,
+    name: str,
+    fmt: str,
+    columns: List[str],
+    batch_size: int,
+    compress: bool = False
+) -> StreamingResponse:
+    """Stream a cursor as a downloadable NDJSON or CSV file.
+
+    The cursor should use the same `batch_size`; output is flushed once
+    per batch. `columns` sets the CSV header (dotted paths reach into
+    subdocuments); NDJSON writes whole projected documents.
+    """
+    body = _encode(cursor, fmt, columns, batch_size)
+    filename = f"{name}.{fmt}"
+    media_type = MEDIA_TYPES[fmt]
+    if compress:
+        body = _gzip(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    return [field.strip() for field in (fields or "").split(",") if field.strip()]
@@ -0,0 +1,42 @@
+"""
+Cross-process leases stored in the `jobs` collection
+"""
+
+import os
+import socket
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+# Identifies this uvicorn worker process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+async def acquire_lease(db, name: str, ttl_seconds: float, owner: str = WORKER_ID) -> bool:
+    """Take or extend the lease `name`; False if another worker holds it"""
+    now = datetime.now()
+    try:
+        await db.jobs.find_one_and_update(
+            {
+                "_id": name,
+                "$or": [
+                    {"leaseOwner": owner},
+                    {"leaseUntil": {"$lt": now}},
+                    {"leaseUntil": {"$exists": False}}
+                ]
+            },
+            {"$set": {
+                "leaseOwner": owner,
+                "leaseUntil": now + timedelta(seconds=ttl_seconds)
+            }},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The document exists and is leased by someone else
+        return False
+
+async def release_lease(db, name: str, owner: str = WORKER_ID):
+    """Give up the lease early so another worker can take over"""
+    await db.jobs.update_one(
+        {"_id": name, "leaseOwner": owner},
+        {"$set": {"leaseUntil": datetime.now()}}
+    )
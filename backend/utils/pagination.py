@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints
+"""
+
+import base64
+from typing import Any, Optional, Tuple
+from bson import json_util
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: Any, last_id: Any) -> str:
+    """Opaque token holding the last sort key and _id of a page"""
+    raw = json_util.dumps({"v": sort_value, "id": last_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> Tuple[Any, Any]:
+    """Inverse of encode_cursor; rejects malformed tokens with 400"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return data["v"], data["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort_field: str, cursor: str) -> dict:
+    """Filter for documents after the cursor in (sort_field, _id) descending order"""
+    sort_value, last_id = decode_cursor(cursor)
+    if sort_field == "_id":
+        return {"_id": {"$lt": last_id}}
+    return {"$or": [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, "_id": {"$lt": last_id}}
+    ]}
+
+def _field_value(doc: dict, path: str) -> Any:
+    """Value at a dotted path such as "availability.HN.available" """
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+def set_next_cursor(response: Optional[Response], docs: list, sort_field: str, limit: int):
+    """Put the token for the page after `docs` in X-Next-Cursor"""
+    if response is not None and len(docs) == limit:
+        last = docs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_field_value(last, sort_field), last["_id"])
+
+def page_stages(sort_field: str, limit: int, skip: int = 0, cursor: Optional[str] = None) -> list:
+    """fetch_page as aggregation stages, for pages built inside a pipeline"""
+    stages = [{"$match": keyset_filter(sort_field, cursor)}] if cursor else []
+    sort = {sort_field: -1}
+    if sort_field != "_id":
+        sort["_id"] = -1
+    stages.append({"$sort": sort})
+    if skip and not cursor:
+        stages.append({"$skip": skip})
+    stages.append({"$limit": limit})
+    return stages
+
+async def fetch_page(
+    collection,
+    filter_query: dict,
+    sort_field: str,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    response: Optional[Response] = None,
+    projection: Optional[dict] = None
+) -> list:
+    """Fetch one page sorted by (sort_field, _id) descending.
+
+    With a cursor the page is an indexed range query that costs the same
+    at any depth; `skip` is kept for older clients. The token for the next
+    page is returned in the X-Next-Cursor header.
+    """
+    query = filter_query
+    if cursor:
+        query = {"$and": [filter_query, keyset_filter(sort_field, cursor)]} if filter_query else keyset_filter(sort_field, cursor)
+
+    sort = [(sort_field, -1)]
+    if sort_field != "_id":
+        sort.append(("_id", -1))
+
+    find = collection.find(query, projection).sort(sort)
+    if skip and not cursor:
+        find = find.skip(skip)
+    docs = await find.limit(limit).to_list(length=limit)
+    set_next_cursor(response, docs, sort_field, limit)
+    return docs
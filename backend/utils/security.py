@@ -2,12 +2,22 @@
 Security utilities for password hashing and JWT tokens
 """
 
+import asyncio
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from config import settings
 
+class PasswordPoolBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop without the pickling overhead of a process pool
+_password_executor: Optional[ThreadPoolExecutor] = None
+_password_pending = 0
+
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
     salt = bcrypt.gensalt()
@@ -21,6 +31,52 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         hashed_password.encode('utf-8')
     )
 
+def get_password_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the executor used for bcrypt work"""
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_POOL_SIZE,
+            thread_name_prefix="password"
+        )
+    return _password_executor
+
+def shutdown_password_executor():
+    """Stop the password executor (called on application shutdown)"""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=True)
+        _password_executor = None
+
+async def _run_password_task(func, *args):
+    """Run a bcrypt call in the executor, rejecting fast when the queue is full"""
+    global _password_pending
+    if _password_pending >= settings.PASSWORD_POOL_SIZE + settings.PASSWORD_QUEUE_LIMIT:
+        raise PasswordPoolBusy()
+    
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+    finally:
+        _password_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    """Hash password without blocking the event loop"""
+    return await _run_password_task(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password without blocking the event loop"""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+def password_pool_stats() -> dict:
+    """Current load of the password executor"""
+    return {
+        "poolSize": settings.PASSWORD_POOL_SIZE,
+        "queueLimit": settings.PASSWORD_QUEUE_LIMIT,
+        "pending": _password_pending
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,140 @@
+"""
+Block-leased ID sequences backed by the `counters` collection
+"""
+
+import asyncio
+import re
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
+from config import settings
+
+# Sequence name -> (collection, field, prefix, zero padding)
+ID_FORMATS: Dict[str, Tuple[str, str, str, int]] = {
+    "members": ("members", "_id", "MEM", 6),
+    "books": ("books", "_id", "BK", 3),
+    "loans": ("loans", "_id", "LN", 6),
+    "transactions": ("transactions", "_id", "TX", 8),
+}
+
+class SequenceService:
+    """Hands out increasing integers per sequence name.
+
+    Each process leases a block of values with a single `$inc` on the
+    counter document and serves allocations from memory until the block
+    runs out. Values are unique across processes but not gap-free:
+    the unused part of a block is lost when the process stops.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._blocks: Dict[str, List[int]] = {}  # name -> [next, last]
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._seeded = set()
+        self.leases = 0
+        self.allocations = 0
+
+    async def _seed(self, db, name: str, collection: str, field: str, prefix: str):
+        """Start a missing counter above the highest ID already in use"""
+        if name in self._seeded:
+            return
+        if await db.counters.find_one({"_id": name}) is None:
+            pipeline = [
+                {"$match": {field: {"$regex": f"^{re.escape(prefix)}\\d+$"}}},
+                {"$group": {
+                    "_id": None,
+                    "max": {"$max": {"$toLong": {"$substrCP": [
+                        f"${field}", len(prefix), {"$strLenCP": f"${field}"}
+                    ]}}}
+                }}
+            ]
+            result = await db[collection].aggregate(pipeline).to_list(length=1)
+            current = result[0]["max"] if result and result[0]["max"] else 0
+            # $max keeps this safe when several workers seed at once
+            await db.counters.update_one(
+                {"_id": name},
+                {"$max": {"value": current}},
+                upsert=True
+            )
+        self._seeded.add(name)
+
+    async def _lease(self, db, name: str, size: int) -> List[int]:
+        counter = await db.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.leases += 1
+        last = counter["value"]
+        return [last - size + 1, last]
+
+    async def next_values(
+        self,
+        db,
+        name: str,
+        count: int = 1,
+        block_size: Optional[int] = None,
+        seed: Optional[Tuple[str, str, str]] = None
+    ) -> List[int]:
+        """Allocate `count` values from sequence `name`.
+
+        `seed` is (collection, field, prefix) used to initialise a counter
+        that does not exist yet from the IDs already stored.
+        """
+        values: List[int] = []
+        block = self._blocks.get(name)
+
+        # Fast path: no awaits, so no other coroutine can interleave
+        while block and block[0] <= block[1] and len(values) < count:
+            values.append(block[0])
+            block[0] += 1
+
+        if len(values) < count:
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if seed is not None:
+                    await self._seed(db, name, *seed)
+                while len(values) < count:
+                    block = self._blocks.get(name)
+                    if not block or block[0] > block[1]:
+                        needed = count - len(values)
+                        size = max(block_size or self.block_size, needed)
+                        block = await self._lease(db, name, size)
+                        self._blocks[name] = block
+                    values.append(block[0])
+                    block[0] += 1
+
+        self.allocations += count
+        return values
+
+    def stats(self) -> dict:
+        return {
+            "blockSize": self.block_size,
+            "leases": self.leases,
+            "allocations": self.allocations,
+            "roundTripsSaved": self.allocations - self.leases,
+        }
+
+sequences = SequenceService(settings.SEQUENCE_BLOCK_SIZE)
+
+async def generate_ids(db, name: str, count: int) -> List[str]:
+    """Generate `count` formatted IDs (e.g. LN000123) for a sequence"""
+    collection, field, prefix, width = ID_FORMATS[name]
+    values = await sequences.next_values(
+        db, name, count, seed=(collection, field, prefix)
+    )
+    return [f"{prefix}{str(value).zfill(width)}" for value in values]
+
+async def generate_id(db, name: str) -> str:
+    """Generate a single formatted ID for a sequence"""
+    return (await generate_ids(db, name, 1))[0]
+
+async def generate_copy_barcode(db, book_id: str) -> str:
+    """Generate the next barcode for a book (e.g. BK001-C004)"""
+    prefix = f"{book_id}-C"
+    # Copies are added rarely and barcodes are printed, so lease one at a time
+    value = (await sequences.next_values(
+        db, f"copies:{book_id}", 1, block_size=1,
+        seed=("copies", "barcode", prefix)
+    ))[0]
+    return f"{prefix}{str(value).zfill(3)}"
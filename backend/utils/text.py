@@ -0,0 +1,33 @@
+"""
+Text normalization for search - Vietnamese diacritic folding and tokenization
+"""
+
+import re
+import unicodedata
+from typing import List
+
+# Bump when fold() or tokenize() change, so derived fields and index
+# snapshots built with the old rules are rebuilt
+TEXT_VERSION = 1
+
+# đ is a separate letter, not d plus a combining mark, so NFD keeps it
+_STROKED_D = str.maketrans({"đ": "d", "Đ": "d"})
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics: "Đà Nẵng" -> "da nang" """
+    decomposed = unicodedata.normalize("NFD", text.translate(_STROKED_D))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+def tokenize(text: str) -> List[str]:
+    """Folded word tokens; Vietnamese syllables are space separated, so each
+    syllable is a token and "Hà Nội" and "ha noi" both give ["ha", "noi"]"""
+    return _TOKEN_RE.findall(fold(text))
+
+def normalize(text: str) -> str:
+    """Folded tokens joined by single spaces"""
+    return " ".join(tokenize(text or ""))
+
+def fold_query(text: str) -> str:
+    """Fold a $text search string, keeping its "phrase" and -negation syntax"""
+    return " ".join(fold(text or "").split())
@@ -1,8 +1,12 @@
 
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from services.events import publish_once, MEMBER_UPDATED
+
 # MongoDB Connection URL (pointing to mongos router)
 MONGODB_URL = "mongodb://localhost:27020/"
 DATABASE_NAME = "elibrary"
@@ -27,6 +31,8 @@ async def promote_user(email):
     )
     
     if result.modified_count > 0:
+        # Running API workers cache members; tell them to reload this one
+        await publish_once(db, MEMBER_UPDATED, memberId=user["_id"])
         print(f"Successfully promoted {email} to ADMIN.")
     else:
         print(f"Failed to update user {email}.")
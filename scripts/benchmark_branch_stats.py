@@ -0,0 +1,95 @@
+"""
+Branch Performance Benchmark
+Compares the grouped branch-performance engine (three $group pipelines)
+with the previous per-branch count_documents loop at 3, 30 and 300
+branches, on synthetic data in a scratch database that is dropped
+afterwards.
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from services.branch_stats import branch_performance
+
+# MongoDB connection
+MONGO_URI = "mongodb://localhost:27020/"
+SCRATCH_DB = "elibrary_branch_bench"
+BRANCH_COUNTS = [3, 30, 300]
+COPIES = 100000
+MEMBERS = 20000
+LOANS = 100000
+
+async def seed(db, branch_count):
+    """Same document totals for every run; only the branch spread changes"""
+    await db.client.drop_database(SCRATCH_DB)
+    rng = random.Random(branch_count)
+    branch_ids = [f"BR{i:03d}" for i in range(branch_count)]
+    await db.branches.insert_many([{"_id": b, "name": f"Branch {b}", "city": "Bench"} for b in branch_ids])
+    await db.copies.insert_many([
+        {"branchId": rng.choice(branch_ids), "status": rng.choice(["available", "available", "borrowed"])}
+        for _ in range(COPIES)
+    ])
+    await db.members.insert_many([{"branchId": rng.choice(branch_ids)} for _ in range(MEMBERS)])
+    await db.loans.insert_many([
+        {"branchId": rng.choice(branch_ids), "status": rng.choice(["active", "overdue", "returned", "returned"])}
+        for _ in range(LOANS)
+    ])
+    # The indexes the per-branch loop relies on (see create-indexes.js)
+    await db.copies.create_index([("branchId", 1), ("status", 1)])
+    await db.members.create_index("branchId")
+    await db.loans.create_index([("branchId", 1), ("status", 1)])
+
+async def per_branch_loop(db):
+    """The previous implementation: five count_documents per branch"""
+    performance = []
+    async for branch in db.branches.find({}):
+        branch_id = branch["_id"]
+        performance.append({
+            "totalCopies": await db.copies.count_documents({"branchId": branch_id}),
+            "availableCopies": await db.copies.count_documents({"branchId": branch_id, "status": "available"}),
+            "totalMembers": await db.members.count_documents({"branchId": branch_id}),
+            "totalLoans": await db.loans.count_documents({"branchId": branch_id}),
+            "activeLoans": await db.loans.count_documents({"branchId": branch_id, "status": {"$in": ["active", "overdue"]}})
+        })
+    return performance
+
+async def timed(fn, db, num_runs):
+    times = []
+    for _ in range(num_runs):
+        start_time = time.perf_counter()
+        result = await fn(db)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return result, times
+
+async def main(num_runs):
+    db = AsyncIOMotorClient(MONGO_URI)[SCRATCH_DB]
+
+    print("="*60)
+    print("E-LIBRARY BRANCH PERFORMANCE BENCHMARK")
+    print("="*60)
+    print(f"\n{COPIES} copies, {MEMBERS} members, {LOANS} loans; {num_runs} runs each (median ms)")
+    print(f"\n  {'branches':>8} {'loop':>10} {'grouped':>10} {'speedup':>8}")
+
+    for branch_count in BRANCH_COUNTS:
+        await seed(db, branch_count)
+        loop_result, loop_times = await timed(per_branch_loop, db, num_runs)
+        grouped_result, grouped_times = await timed(branch_performance, db, num_runs)
+
+        # Both must agree before their timings mean anything
+        grouped_metrics = [{key: row[key] for key in loop_result[0]} for row in grouped_result]
+        assert sorted(map(str, loop_result)) == sorted(map(str, grouped_metrics)), "results differ"
+
+        loop_ms = statistics.median(loop_times)
+        grouped_ms = statistics.median(grouped_times)
+        print(f"  {branch_count:>8} {loop_ms:>10.2f} {grouped_ms:>10.2f} {loop_ms / grouped_ms:>7.1f}x")
+
+    await db.client.drop_database(SCRATCH_DB)
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
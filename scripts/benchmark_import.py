@@ -0,0 +1,111 @@
+"""
+Catalog Import Benchmark
+Measures bulk import throughput (rows/sec) into a scratch database at
+several chunk sizes, against one POST /books/-style insert per row.
+The scratch database is dropped afterwards; the catalog is not touched.
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from services.catalog_import import CatalogImport, read_rows
+from services.search import search_fields
+
+# MongoDB connection
+MONGO_URI = "mongodb://localhost:27020/"
+SCRATCH_DB = "elibrary_import_bench"
+BRANCHES = ["HN", "HCM", "DN"]
+CHUNK_SIZES = [100, 1000, 5000]
+PER_ROW_LIMIT = 2000
+
+def synthetic_rows(count, seed):
+    """JSONL catalog of `count` books with 1-3 copies each"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        lines.append(json.dumps({
+            "isbn": f"978-{seed}-{i:09d}",
+            "title": f"Synthetic Book {i} Vol {rng.randint(1, 9)}",
+            "authors": [f"Author {rng.randint(1, 5000)}"],
+            "lccCode": rng.choice(["QA", "DS", "H", "PZ"]),
+            "lccName": "Synthetic",
+            "subjects": [f"Subject {rng.randint(1, 200)}"],
+            "description": "Generated for the import benchmark",
+            "publisher": "Bench Press",
+            "publishedYear": rng.randint(1950, 2024),
+            "copies": {rng.choice(BRANCHES): rng.randint(1, 3)}
+        }))
+    return "\n".join(lines)
+
+async def reset(db):
+    await db.client.drop_database(SCRATCH_DB)
+    await db.branches.insert_many([{"_id": branch_id} for branch_id in BRANCHES])
+    await db.books.create_index("isbn", unique=True, name="books_isbn_unique")
+
+async def bulk_import(db, text, chunk_size):
+    await reset(db)
+    job = CatalogImport(db, chunk_size=chunk_size)
+    start_time = time.perf_counter()
+    async for event in job.run(read_rows(io.StringIO(text), "jsonl")):
+        summary = event
+    return summary, time.perf_counter() - start_time
+
+async def per_row_import(db, text):
+    """What loading a catalog through POST /books/ costs: an ISBN check,
+    an ID and an insert per book, plus an insert per copy"""
+    await reset(db)
+    start_time = time.perf_counter()
+    rows = 0
+    for line in text.splitlines():
+        book = json.loads(line)
+        copies = book.pop("copies")
+        if await db.books.find_one({"isbn": book["isbn"]}):
+            continue
+        rows += 1
+        book["_id"] = f"BK{rows:09d}"
+        book["search"] = search_fields(book)
+        await db.books.insert_one(book)
+        for branch_id, count in copies.items():
+            for n in range(count):
+                barcode = f"{book['_id']}-C{n + 1:03d}"
+                await db.copies.insert_one({"_id": barcode, "bookId": book["_id"], "branchId": branch_id, "barcode": barcode})
+    return rows, time.perf_counter() - start_time
+
+async def main(count):
+    db = AsyncIOMotorClient(MONGO_URI)[SCRATCH_DB]
+    text = synthetic_rows(count, seed=42)
+
+    print("="*60)
+    print("E-LIBRARY CATALOG IMPORT BENCHMARK")
+    print("="*60)
+    print(f"\n{count} rows, {len(text) / 1024 / 1024:.1f} MB of JSONL")
+
+    print(f"\n  {'method':<24} {'rows':>8} {'copies':>8} {'seconds':>8} {'rows/s':>9}")
+    per_row = min(count, PER_ROW_LIMIT)
+    rows, seconds = await per_row_import(db, "\n".join(text.splitlines()[:per_row]))
+    print(f"  {'per-row inserts':<24} {rows:>8} {'':>8} {seconds:>8.2f} {rows / seconds:>9.0f}")
+    for chunk_size in CHUNK_SIZES:
+        summary, seconds = await bulk_import(db, text, chunk_size)
+        print(f"  {f'bulk, chunk {chunk_size}':<24} {summary['inserted']:>8} {summary['copies']:>8} "
+              f"{seconds:>8.2f} {summary['rows'] / seconds:>9.0f}")
+
+    # Rerunning the same file should skip every row
+    job = CatalogImport(db, chunk_size=CHUNK_SIZES[1])
+    start_time = time.perf_counter()
+    async for summary in job.run(read_rows(io.StringIO(text), "jsonl")):
+        pass
+    seconds = time.perf_counter() - start_time
+    print(f"  {'rerun (all duplicates)':<24} {summary['duplicates']:>8} {summary['copies']:>8} "
+          f"{seconds:>8.2f} {summary['rows'] / seconds:>9.0f}")
+
+    await db.client.drop_database(SCRATCH_DB)
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,89 @@
+"""
+Login Throughput Benchmark
+Measures logins/sec and the latency other routes see while logins run
+"""
+
+import sys
+import time
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BASE_URL = "http://localhost:8000"
+LOGIN = {"email": "member1@example.com", "password": "password123"}
+
+LOGIN_THREADS = 16
+PROBE_INTERVAL = 0.02
+DURATION_SECONDS = 20
+
+def percentile(times, pct):
+    """Nearest-rank percentile of a list of durations"""
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def login_worker(stop_event, results):
+    """Log in repeatedly until stopped"""
+    session = requests.Session()
+    while not stop_event.is_set():
+        start_time = time.perf_counter()
+        resp = session.post(f"{BASE_URL}/auth/login", json=LOGIN)
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        results.append((resp.status_code, duration_ms))
+
+def probe_worker(stop_event, times, path):
+    """Hit a cheap route at a fixed rate to observe event loop stalls"""
+    session = requests.Session()
+    while not stop_event.is_set():
+        start_time = time.perf_counter()
+        session.get(f"{BASE_URL}{path}")
+        times.append((time.perf_counter() - start_time) * 1000)
+        time.sleep(PROBE_INTERVAL)
+
+def run(login_threads, duration, probe_path="/books/?limit=1"):
+    """Run logins and probes concurrently, return (login results, probe times)"""
+    stop_event = threading.Event()
+    login_results = []
+    probe_times = []
+
+    with ThreadPoolExecutor(max_workers=login_threads + 1) as pool:
+        pool.submit(probe_worker, stop_event, probe_times, probe_path)
+        for _ in range(login_threads):
+            pool.submit(login_worker, stop_event, login_results)
+        time.sleep(duration)
+        stop_event.set()
+
+    return login_results, probe_times
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else LOGIN_THREADS
+
+    print("="*60)
+    print("E-LIBRARY LOGIN BENCHMARK")
+    print("="*60)
+    print(f"\nTarget: {BASE_URL}")
+    print(f"Login threads: {threads}, duration: {DURATION_SECONDS}s")
+
+    # Baseline: probe latency with no login traffic
+    _, idle_probes = run(0, 5)
+
+    # Under load
+    login_results, busy_probes = run(threads, DURATION_SECONDS)
+
+    ok = [d for code, d in login_results if code == 200]
+    rejected = sum(1 for code, _ in login_results if code == 503)
+
+    print("\n" + "="*60)
+    print("RESULTS")
+    print("="*60)
+    print(f"  Successful logins:   {len(ok)}")
+    print(f"  Rejected (503):      {rejected}")
+    print(f"  Logins/sec:          {len(ok) / DURATION_SECONDS:.1f}")
+    if ok:
+        print(f"  Login p50:           {statistics.median(ok):.2f} ms")
+        print(f"  Login p99:           {percentile(ok, 0.99):.2f} ms")
+    if idle_probes:
+        print(f"  Other route p99 (idle):   {percentile(idle_probes, 0.99):.2f} ms")
+    if busy_probes:
+        print(f"  Other route p99 (logins): {percentile(busy_probes, 0.99):.2f} ms")
+    print("="*60)
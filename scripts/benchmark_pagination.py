@@ -0,0 +1,92 @@
+"""
+Pagination Benchmark
+Compares skip/limit with keyset (cursor) pagination at page 1 and page 1000
+"""
+
+import time
+import statistics
+from pymongo import MongoClient
+
+# MongoDB connection
+MONGO_URI = "mongodb://localhost:27020/"
+client = MongoClient(MONGO_URI)
+db = client['elibrary']
+
+PAGE_SIZE = 50
+DEEP_PAGE = 1000
+
+def skip_page(page):
+    """Fetch a page the old way"""
+    return list(db.transactions.find({})
+                .sort([("createdAt", -1), ("_id", -1)])
+                .skip((page - 1) * PAGE_SIZE)
+                .limit(PAGE_SIZE))
+
+def keyset_page(last):
+    """Fetch the page after `last` (None for page 1)"""
+    query = {}
+    if last is not None:
+        query = {"$or": [
+            {"createdAt": {"$lt": last["createdAt"]}},
+            {"createdAt": last["createdAt"], "_id": {"$lt": last["_id"]}}
+        ]}
+    return list(db.transactions.find(query)
+                .sort([("createdAt", -1), ("_id", -1)])
+                .limit(PAGE_SIZE))
+
+def time_call(func, *args, runs=20):
+    times = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        func(*args)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return times
+
+def docs_examined(query_fn):
+    """Total documents examined across shards, from explain()"""
+    explain = query_fn().explain()
+    stats = explain.get("executionStats", {})
+    return stats.get("totalDocsExamined", "n/a")
+
+if __name__ == "__main__":
+    print("="*60)
+    print("E-LIBRARY PAGINATION BENCHMARK")
+    print("="*60)
+
+    total = db.transactions.count_documents({})
+    print(f"\n✓ transactions has {total} documents")
+    deep_page = min(DEEP_PAGE, max(1, total // PAGE_SIZE))
+    print(f"  Page size: {PAGE_SIZE}, deep page: {deep_page}")
+
+    # The keyset cursor for the deep page: the last document of the previous page
+    anchor = None
+    if deep_page > 1:
+        anchor = skip_page(deep_page - 1)[-1]
+
+    results = {
+        "skip page 1": time_call(skip_page, 1),
+        f"skip page {deep_page}": time_call(skip_page, deep_page),
+        "keyset page 1": time_call(keyset_page, None),
+        f"keyset page {deep_page}": time_call(keyset_page, anchor),
+    }
+
+    print("\n" + "="*60)
+    print("RESULTS (ms)")
+    print("="*60)
+    for label, times in results.items():
+        print(f"  {label:<22} avg {statistics.mean(times):8.2f}   "
+              f"p95 {sorted(times)[int(len(times) * 0.95)]:8.2f}")
+
+    skip_cursor = lambda: db.transactions.find({}).sort([("createdAt", -1), ("_id", -1)]).skip((deep_page - 1) * PAGE_SIZE).limit(PAGE_SIZE)
+    keyset_query = {} if anchor is None else {"$or": [
+        {"createdAt": {"$lt": anchor["createdAt"]}},
+        {"createdAt": anchor["createdAt"], "_id": {"$lt": anchor["_id"]}}
+    ]}
+    keyset_cursor = lambda: db.transactions.find(keyset_query).sort([("createdAt", -1), ("_id", -1)]).limit(PAGE_SIZE)
+
+    print("\nDocuments examined at the deep page:")
+    print(f"  skip/limit: {docs_examined(skip_cursor)}")
+    print(f"  keyset:     {docs_examined(keyset_cursor)}")
+    print("="*60)
+
+    client.close()
@@ -0,0 +1,135 @@
+"""
+Search Backend Benchmark
+Compares the Mongo $text index against the in-memory BM25 index
+for latency and relevance on the same queries, then measures fuzzy
+search on misspelled versions of them.
+"""
+
+import os
+import sys
+import time
+import statistics
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from services.search import SEARCH_PROJECTION, build_index
+from services.fuzzy import FUZZY_PROJECTION, TrigramIndex
+from utils.text import normalize, tokenize
+
+# MongoDB connection
+MONGO_URI = "mongodb://localhost:27020/"
+client = MongoClient(MONGO_URI)
+db = client['elibrary']
+
+TEST_QUERIES = [
+    "Technology",
+    "Computer Science",
+    "History",
+    "Vietnam",
+    "Fiction",
+    "Science",
+    "Business",
+    "Engineering",
+    "Medicine",
+    "Literature"
+]
+TOP_K = 10
+
+def text_search(query):
+    return [book["_id"] for book in db.books.find(
+        {"$text": {"$search": normalize(query)}},
+        {"score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(TOP_K)]
+
+def misspell(query):
+    """Swap two letters in the middle of each word"""
+    words = []
+    for word in query.split():
+        mid = len(word) // 2
+        words.append(word[:mid - 1] + word[mid] + word[mid - 1] + word[mid + 1:] if len(word) > 3 else word)
+    return " ".join(words)
+
+def title_precision(book_ids, query):
+    """Share of results whose title contains every query term"""
+    if not book_ids:
+        return 0.0
+    terms = set(tokenize(query))
+    titles = {b["_id"]: b.get("title", "") for b in db.books.find({"_id": {"$in": book_ids}}, {"title": 1})}
+    hits = sum(1 for book_id in book_ids if terms <= set(tokenize(titles.get(book_id, ""))))
+    return hits / len(book_ids)
+
+def run(label, search, num_runs):
+    print(f"\n  {label}...")
+    times = []
+    for i in range(num_runs):
+        query = TEST_QUERIES[i % len(TEST_QUERIES)]
+        start_time = time.perf_counter()
+        search(query)
+        times.append((time.perf_counter() - start_time) * 1000)
+    return times
+
+def print_statistics(label, times):
+    print(f"\n{label}:")
+    print(f"  Average: {statistics.mean(times):.2f} ms")
+    print(f"  Median:  {statistics.median(times):.2f} ms")
+    print(f"  Min:     {min(times):.2f} ms")
+    print(f"  Max:     {max(times):.2f} ms")
+
+if __name__ == "__main__":
+    num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    print("="*60)
+    print("E-LIBRARY SEARCH BACKEND BENCHMARK")
+    print("="*60)
+
+    start_time = time.perf_counter()
+    index = build_index(db.books.find({}, SEARCH_PROJECTION).batch_size(1000))
+    build_seconds = time.perf_counter() - start_time
+    stats = index.stats()
+    print(f"\nBM25 index: {stats['documents']} books, {stats['terms']} terms, "
+          f"{stats['postings']} postings, built in {build_seconds:.2f}s")
+
+    bm25_search = lambda query: [book_id for book_id, _ in index.search(query, TOP_K)]
+
+    text_times = run("$text", text_search, num_runs)
+    bm25_times = run("BM25 (index only)", bm25_search, num_runs)
+
+    print("\n" + "="*60)
+    print("LATENCY")
+    print("="*60)
+    print_statistics("$text index", text_times)
+    print_statistics("BM25 in-memory", bm25_times)
+
+    print("\n" + "="*60)
+    print(f"RELEVANCE (top {TOP_K})")
+    print("="*60)
+    print(f"\n  {'query':<20} {'overlap':>8} {'$text P':>8} {'BM25 P':>8}")
+    for query in TEST_QUERIES:
+        text_ids = text_search(query)
+        bm25_ids = bm25_search(query)
+        overlap = len(set(text_ids) & set(bm25_ids)) / TOP_K
+        print(f"  {query:<20} {overlap:>8.0%} "
+              f"{title_precision(text_ids, query):>8.0%} {title_precision(bm25_ids, query):>8.0%}")
+    print("\n  overlap: shared results; P: share of results with every term in the title")
+
+    print("\n" + "="*60)
+    print("FUZZY SEARCH (misspelled queries, budget 20 ms)")
+    print("="*60)
+    start_time = time.perf_counter()
+    fuzzy_index = TrigramIndex()
+    for book in db.books.find({}, FUZZY_PROJECTION).batch_size(1000):
+        fuzzy_index.add(book)
+    print(f"\nTrigram index: {fuzzy_index.stats()['words']} words, "
+          f"built in {time.perf_counter() - start_time:.2f}s")
+
+    fuzzy_times = []
+    print(f"\n  {'misspelled query':<22} {'ms':>7} {'overlap':>8}")
+    for query in TEST_QUERIES:
+        typo = misspell(query)
+        start_time = time.perf_counter()
+        fuzzy_ids = [book_id for book_id, _ in fuzzy_index.search(typo, TOP_K)]
+        fuzzy_times.append((time.perf_counter() - start_time) * 1000)
+        overlap = len(set(fuzzy_ids) & set(bm25_search(query))) / TOP_K
+        print(f"  {typo:<22} {fuzzy_times[-1]:>7.2f} {overlap:>8.0%}")
+    print_statistics("Fuzzy (index only)", fuzzy_times)
+    print("\n  overlap: shared results with BM25 on the correctly spelled query")
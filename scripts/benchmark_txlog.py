@@ -0,0 +1,81 @@
+"""
+Transaction Log Benchmark
+Measures borrow/return request latency against a running API.
+Run it once with TXLOG_MODE=strict and once with TXLOG_MODE=fast
+on the backend, then compare the two reports.
+"""
+
+import sys
+import time
+import statistics
+import requests
+
+BASE_URL = "http://localhost:8000"
+LOGIN = {"email": "member1@example.com", "password": "password123"}
+CYCLES = 200
+
+def percentile(times, pct):
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def find_available_copy(session, branch_id):
+    """Pick an available copy at the member's branch"""
+    books = session.get(f"{BASE_URL}/books/", params={"limit": 100}).json()
+    for book in books:
+        copies = session.get(
+            f"{BASE_URL}/books/{book['_id']}/copies",
+            params={"branchId": branch_id, "status": "available"}
+        ).json()
+        if copies:
+            return copies[0]["_id"]
+    return None
+
+if __name__ == "__main__":
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else CYCLES
+
+    session = requests.Session()
+    token = session.post(f"{BASE_URL}/auth/login", json=LOGIN).json()["access_token"]
+    session.headers["Authorization"] = f"Bearer {token}"
+
+    me = session.get(f"{BASE_URL}/auth/me").json()
+    runtime = session.get(f"{BASE_URL}/stats/runtime").json()
+    mode = runtime.get("transactionLog", {}).get("mode", "unknown")
+
+    copy_id = find_available_copy(session, me["branchId"])
+    if copy_id is None:
+        print("✗ No available copy at the member's branch")
+        sys.exit(1)
+
+    print("="*60)
+    print("E-LIBRARY TRANSACTION LOG BENCHMARK")
+    print("="*60)
+    print(f"\nTransaction log mode: {mode}")
+    print(f"Cycles (borrow + return): {cycles}")
+
+    borrow_times = []
+    return_times = []
+    for i in range(cycles):
+        start_time = time.perf_counter()
+        resp = session.post(f"{BASE_URL}/loans/borrow", json={"copyId": copy_id, "memberId": me["_id"]})
+        borrow_times.append((time.perf_counter() - start_time) * 1000)
+        if resp.status_code != 201:
+            print(f"✗ Borrow failed: {resp.text}")
+            break
+        loan_id = resp.json()["_id"]
+
+        start_time = time.perf_counter()
+        session.post(f"{BASE_URL}/loans/return/{loan_id}")
+        return_times.append((time.perf_counter() - start_time) * 1000)
+
+        if (i + 1) % 50 == 0:
+            print(f"  Completed {i + 1}/{cycles} cycles...")
+
+    print("\n" + "="*60)
+    print(f"RESULTS ({mode})")
+    print("="*60)
+    for label, times in [("borrow", borrow_times), ("return", return_times)]:
+        if times:
+            print(f"  {label:<7} avg {statistics.mean(times):7.2f} ms   "
+                  f"p50 {statistics.median(times):7.2f} ms   "
+                  f"p99 {percentile(times, 0.99):7.2f} ms")
+    print("="*60)
@@ -14,27 +14,39 @@ const db = conn.getDB("elibrary");
 // ============================================
 print("\n[1/4] Creating text index on 'books' collection...");
 
+// The index covers the diacritic-folded `search.*` fields that the API
+// and seed-data.py maintain on write (backfill: python jobs.py
+// backfill-search-fields). English stemming stays on for the English
+// titles; folded Vietnamese syllables pass through the stemmer mostly
+// unchanged. The override field is one books do not have ("vi" is not a
+// text language).
 try {
+    const existing = db.books.getIndexes().find(idx => idx.name === "books_fulltext_idx");
+    if (existing && (!existing.weights["search.title"] || existing.default_language !== "english")) {
+        db.books.dropIndex("books_fulltext_idx");
+        print("✓ Dropped previous text index");
+    }
     db.books.createIndex(
         {
-            title: "text",
-            authors: "text",
-            subjects: "text",
-            description: "text"
+            "search.title": "text",
+            "search.authors": "text",
+            "search.subjects": "text",
+            "search.description": "text"
         },
         {
             name: "books_fulltext_idx",
             weights: {
-                title: 10,
-                authors: 5,
-                subjects: 3,
-                description: 1
+                "search.title": 10,
+                "search.authors": 5,
+                "search.subjects": 3,
+                "search.description": 1
             },
-            default_language: "english"
+            default_language: "english",
+            language_override: "searchLanguage"
         }
     );
     print("✓ Text index created on books collection");
-    print("  Fields: title (weight 10), authors (5), subjects (3), description (1)");
+    print("  Fields: search.title (weight 10), search.authors (5), search.subjects (3), search.description (1)");
 } catch (e) {
     print("! Error creating text index: " + e.message);
 }
@@ -44,6 +56,22 @@ try {
 // ============================================
 print("\n[2/4] Creating compound indexes...");
 
+// Books - ISBN lookup (unique); bulk import dedupes and upserts on it
+try {
+    db.books.createIndex({ isbn: 1 }, { unique: true, name: "books_isbn_unique" });
+    print("✓ Unique index on books.isbn");
+} catch (e) {
+    print("! books.isbn index: " + e.message);
+}
+
+// Books - search text changed since a BM25 snapshot (worker catch-up)
+try {
+    db.books.createIndex({ "search.at": 1 }, { name: "books_search_at_idx" });
+    print("✓ Index on books.search.at");
+} catch (e) {
+    print("! books.search.at index: " + e.message);
+}
+
 // Members - email lookup (unique)
 try {
     db.members.createIndex({ email: 1 }, { unique: true, name: "members_email_unique" });
@@ -76,6 +104,34 @@ try {
     print("! copies compound index: " + e.message);
 }
 
+// Copies - status across branches (dashboard available-copies count)
+try {
+    db.copies.createIndex({ status: 1 }, { name: "copies_status_idx" });
+    print("✓ Index on copies.status");
+} catch (e) {
+    print("! copies.status index: " + e.message);
+}
+
+// Books - "available at my branch" filter and sort, one index per branch
+// on the embedded availability summary (rerun after adding a branch)
+db.branches.find({}, { _id: 1 }).forEach(branch => {
+    const field = `availability.${branch._id}.available`;
+    try {
+        db.books.createIndex({ [field]: -1, _id: -1 }, { name: `books_available_${branch._id}_idx` });
+        print(`✓ Index on books.${field}`);
+    } catch (e) {
+        print(`! books ${field} index: ` + e.message);
+    }
+});
+
+// Copies - borrow-by-book claims an available copy at the member's branch
+try {
+    db.copies.createIndex({ bookId: 1, branchId: 1, status: 1 }, { name: "copies_book_branch_status_idx" });
+    print("✓ Compound index on copies.bookId + branchId + status");
+} catch (e) {
+    print("! copies book/branch/status index: " + e.message);
+}
+
 // Loans - member lookup
 try {
     db.loans.createIndex({ memberId: 1 }, { name: "loans_member_idx" });
@@ -92,6 +148,22 @@ try {
     print("! loans.status index: " + e.message);
 }
 
+// Loans - overdue sweeper (active loans by due date)
+try {
+    db.loans.createIndex({ status: 1, dueAt: 1 }, { name: "loans_status_due_idx" });
+    print("✓ Compound index on loans.status + dueAt");
+} catch (e) {
+    print("! loans status/dueAt index: " + e.message);
+}
+
+// Loans - keyset pagination (newest first)
+try {
+    db.loans.createIndex({ borrowedAt: -1, _id: -1 }, { name: "loans_borrowed_id_idx" });
+    print("✓ Compound index on loans.borrowedAt + _id");
+} catch (e) {
+    print("! loans borrowedAt/_id index: " + e.message);
+}
+
 // Digital Licenses - book lookup
 try {
     db.digital_licenses.createIndex({ bookId: 1 }, { name: "licenses_book_idx" });
@@ -121,6 +193,55 @@ try {
     print("! transactions.type index: " + e.message);
 }
 
+// Transactions - keyset pagination (newest first)
+try {
+    db.transactions.createIndex({ createdAt: -1, _id: -1 }, { name: "transactions_created_id_idx" });
+    print("✓ Compound index on transactions.createdAt + _id");
+} catch (e) {
+    print("! transactions createdAt/_id index: " + e.message);
+}
+
+// Transactions - per-member history (newest first)
+try {
+    db.transactions.createIndex({ memberId: 1, createdAt: -1, _id: -1 }, { name: "transactions_member_created_idx" });
+    print("✓ Compound index on transactions.memberId + createdAt");
+} catch (e) {
+    print("! transactions memberId/createdAt index: " + e.message);
+}
+
+// Transactions - type filter within a time window
+try {
+    db.transactions.createIndex({ type: 1, createdAt: -1, _id: -1 }, { name: "transactions_type_created_idx" });
+    print("✓ Compound index on transactions.type + createdAt");
+} catch (e) {
+    print("! transactions type/createdAt index: " + e.message);
+}
+
+// Daily stats rollup - trends read a date range
+try {
+    db.daily_stats.createIndex({ date: 1, branchId: 1 }, { name: "daily_stats_date_idx" });
+    print("✓ Compound index on daily_stats.date + branchId");
+} catch (e) {
+    print("! daily_stats date index: " + e.message);
+}
+
+// Books - top borrowed, overall and per category (borrowCount leaderboard)
+try {
+    db.books.createIndex({ borrowCount: -1, _id: 1 }, { name: "books_borrow_count_idx" });
+    db.books.createIndex({ lccCode: 1, borrowCount: -1, _id: 1 }, { name: "books_lcc_borrow_count_idx" });
+    print("✓ Indexes on books.borrowCount and lccCode + borrowCount");
+} catch (e) {
+    print("! books borrowCount indexes: " + e.message);
+}
+
+// Per-book daily borrow buckets - leaderboards over a date range
+try {
+    db.book_daily_stats.createIndex({ date: 1, branchId: 1 }, { name: "book_daily_stats_date_idx" });
+    print("✓ Compound index on book_daily_stats.date + branchId");
+} catch (e) {
+    print("! book_daily_stats date index: " + e.message);
+}
+
 // ============================================
 // 4. Verification
 // ============================================
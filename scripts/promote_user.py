@@ -1,7 +1,11 @@
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from services.events import publish_once, MEMBER_UPDATED
+
 # Database configuration
 MONGO_DETAILS = "mongodb://localhost:27017"
 DB_NAME = "elibrary"
@@ -22,6 +26,9 @@ async def promote_user(email: str):
         {"$set": {"role": "admin"}}
     )
     
+    # Running API workers cache members; tell them to reload this one
+    await publish_once(db, MEMBER_UPDATED, memberId=user["_id"])
+    
     print(f"✅ User '{email}' has been promoted to ADMIN.")
 
 if __name__ == "__main__":
@@ -3,11 +3,22 @@ E-Library Data Seeding Script
 Generates realistic data for the distributed library system
 """
 
+import asyncio
+import os
 import random
+import sys
 from datetime import datetime, timedelta
 from pymongo import MongoClient
 from faker import Faker
 import bcrypt
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from services.search import search_fields
+from jobs import run_job
+
+# Derived data the API keeps up to date on write, built once from the seed
+DERIVED_JOBS = ["rebuild-availability", "backfill-daily-stats", "rebuild-borrow-stats"]
 
 # Initialize Faker
 fake = Faker(['vi_VN', 'en_US'])
@@ -141,6 +152,8 @@ def generate_books(count=1000):
             "pages": random.randint(100, 800)
             # Note: language field removed to avoid conflict with text index
         }
+        # Folded text the $text index covers, as the API writes it
+        book["search"] = search_fields(book)
         books.append(book)
     
     db.books.insert_many(books)
@@ -174,6 +187,18 @@ def generate_copies(books, count=5000):
     
     db.copies.insert_many(copies)
     print(f"✓ Inserted {len(copies)} copies")
+    
+    # Per-branch availability summary, as the API keeps it on each book
+    summaries = {book["_id"]: {} for book in books}
+    for copy in copies:
+        counts = summaries[copy["bookId"]].setdefault(copy["branchId"], {"available": 0, "total": 0})
+        counts["total"] += 1
+        if copy["status"] == "available":
+            counts["available"] += 1
+    db.books.bulk_write([
+        UpdateOne({"_id": book_id}, {"$set": {"availability": summary}})
+        for book_id, summary in summaries.items()
+    ], ordered=False)
     return copies
 
 def generate_members(count=1000):
@@ -413,6 +438,10 @@ if __name__ == "__main__":
         generate_loans_and_transactions(members, copies, 3000)
         generate_digital_licenses(books)
         
+        print("\nBuilding derived statistics...")
+        for job in DERIVED_JOBS:
+            asyncio.run(run_job(job))
+        
         # Print summary
         print_summary()
         